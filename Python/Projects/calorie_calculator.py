@@ -1,31 +1,321 @@
 import json  # Import the json module to work with JSON files
+import hashlib  # Hash the source file to detect a stale cache
+import os  # File paths for the cache and the benchmark
+import re  # Import the re module to split names into words
+import struct  # Pack and unpack the cache header
+import tempfile  # Temporary files for the benchmark
+import time  # Import the time module to time the benchmark
+from bisect import bisect_left, insort  # Binary search over the sorted name and word lists
+from collections import Counter  # Count shared trigrams for the fuzzy tier
+from itertools import islice  # Take part of a large trigram posting in the fuzzy tier
+import numpy as np  # Import NumPy for the nutrient matrix
 
-# Open the nutrition.json file in read mode and load its content into a dictionary
-with open('nutrition.json', 'r') as json_file:
-    nutrition_dict = json.load(json_file)  # Load the JSON content into a dictionary
-    
-# Display the first 3 items of the nutrition dictionary
-list(nutrition_dict.items())[:3]
+# Nutrition index: a dense matrix with one row per food and one column per nutrient,
+# so the totals of a whole batch of meals come out of a single matrix multiply
+
+NUTRIENTS = ["calories", "total_fat", "protein", "carbohydrate", "sugars"]  # Columns of the nutrient matrix
+
+class NutritionIndex:
+    def __init__(self, nutrition_dict):
+        self.foods = list(nutrition_dict)  # Row number -> food name
+        self.rows = {food: row for row, food in enumerate(self.foods)}  # Food name -> row number
+        # Nutrient values per 100 g of each food, in the order of NUTRIENTS (missing values count as 0)
+        self.matrix = np.array([[values.get(nutrient, 0.0) for nutrient in NUTRIENTS] for values in nutrition_dict.values()],
+                               dtype=np.float64).reshape(len(self.foods), len(NUTRIENTS))
+
+    @classmethod
+    def from_columns(cls, foods, matrix):
+        # Build an index from a list of food names and a matching (foods, len(NUTRIENTS)) matrix, e.g. a memory-mapped one
+        index = cls.__new__(cls)
+        index.foods = foods
+        index.rows = dict(zip(foods, range(len(foods))))
+        index.matrix = matrix
+        return index
+
+    def food_ids(self, names):
+        # Convert food names to row numbers, raising KeyError for an unknown food
+        return np.array([self.rows[name] for name in names], dtype=np.int64)
+
+    def meal_totals(self, ingredient_ids, grams):
+        # ingredient_ids and grams have shape (meals, ingredients per meal); pad shorter meals with grams of 0.
+        # Returns the nutrient totals of every meal, shape (meals, len(NUTRIENTS)), as one batched matrix multiply
+        ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        grams = np.asarray(grams, dtype=np.float64)
+        return np.matmul(grams[:, None, :] / 100, self.matrix[ingredient_ids])[:, 0, :]
+
+def meal_totals_dict(nutrition_dict, meal):
+    # The dict approach: add up the nutrients of a meal given as a list of (food name, grams) tuples
+    totals = dict.fromkeys(NUTRIENTS, 0.0)
+    for food, grams in meal:
+        for nutrient in NUTRIENTS:
+            totals[nutrient] += nutrition_dict[food].get(nutrient, 0.0) * grams / 100
+    return totals
+
+def benchmark_meals(foods=5_000, meals=200_000, ingredients=8, seed=42):
+    # Compare the dict approach with the nutrition index on a synthetic food database
+    rng = np.random.default_rng(seed)
+    synthetic_dict = {f"Food {i}": dict(zip(NUTRIENTS, rng.uniform(0, 100, len(NUTRIENTS)).round(2).tolist())) for i in range(foods)}
+    ingredient_ids = rng.integers(0, foods, (meals, ingredients))
+    grams = rng.uniform(10, 250, (meals, ingredients)).round()
+
+    names = list(synthetic_dict)
+    meal_lists = [[(names[food], amount) for food, amount in zip(meal_ids, meal_grams)]
+                  for meal_ids, meal_grams in zip(ingredient_ids.tolist(), grams.tolist())]
+    start = time.perf_counter()
+    dict_totals = [meal_totals_dict(synthetic_dict, meal) for meal in meal_lists]
+    dict_time = time.perf_counter() - start
+
+    index = NutritionIndex(synthetic_dict)
+    start = time.perf_counter()
+    index_totals = index.meal_totals(ingredient_ids, grams)
+    index_time = time.perf_counter() - start
+
+    same = np.allclose(index_totals, [[totals[nutrient] for nutrient in NUTRIENTS] for totals in dict_totals])
+    print(f"{meals:,} meals: dict {meals / dict_time:,.0f} meals/s, nutrition index {meals / index_time:,.0f} meals/s "
+          f"({dict_time / index_time:.0f}x), same totals: {same}")
+
+# Food search index for type-ahead search over the food names (the keys of nutrition_dict).
+# Matches are ranked in three tiers:
+#   1. the name starts with the query ("nuts, pe" -> "Nuts, pecans")
+#   2. a word of the name starts with the query ("pec" -> "Nuts, pecans")
+#   3. fuzzy: the name shares trigrams (3-letter pieces) with the query, which tolerates typos ("pecnas")
+# Prefix and word matches use binary search over sorted lists; fuzzy matches use a trigram -> foods dict
+# and only look at the foods of the query's rarest trigrams, so a query never visits the whole list
+
+class FoodSearchIndex:
+    def __init__(self, food_names=()):
+        self.names = []  # Food id -> original food name
+        self.sorted_names = []  # Sorted list of (lowercase name, food id)
+        self.sorted_words = []  # Sorted list of (lowercase word, food id)
+        self.trigrams = {}  # Trigram -> set of food ids whose name contains it
+        for name in food_names:  # Build the lists unsorted, then sort them once
+            self._add_unsorted(name)
+        self.sorted_names.sort()
+        self.sorted_words.sort()
+
+    @staticmethod
+    def _trigrams(text):
+        padded = f"  {text.lower()} "  # Pad so the start of the text has its own trigrams
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _add_unsorted(self, name):
+        food_id = len(self.names)
+        self.names.append(name)
+        self.sorted_names.append((name.lower(), food_id))
+        self.sorted_words.extend((word, food_id) for word in set(re.findall(r"\w+", name.lower())))
+        for trigram in self._trigrams(name):
+            self.trigrams.setdefault(trigram, set()).add(food_id)
+
+    def add(self, name):
+        # Add a food name incrementally, e.g. when a food is added to nutrition_dict
+        food_id = len(self.names)
+        self.names.append(name)
+        insort(self.sorted_names, (name.lower(), food_id))
+        for word in set(re.findall(r"\w+", name.lower())):
+            insort(self.sorted_words, (word, food_id))
+        for trigram in self._trigrams(name):
+            self.trigrams.setdefault(trigram, set()).add(food_id)
+
+    @staticmethod
+    def _prefix_matches(sorted_list, prefix, limit):
+        # Food ids of the first entries of a sorted list starting with prefix
+        matches = []
+        for i in range(bisect_left(sorted_list, (prefix,)), len(sorted_list)):
+            text, food_id = sorted_list[i]
+            if not text.startswith(prefix) or len(matches) == limit:
+                break
+            matches.append(food_id)
+        return matches
+
+    def search(self, query, limit=10, max_candidates=2_000):
+        # Return up to limit food names matching query, best matches first.
+        # The fuzzy tier only runs when the other tiers leave room. Its candidates are at most max_candidates foods,
+        # taken from the query's rarest trigrams first since common trigrams tell foods apart poorly. Trigrams no
+        # food has are skipped, and a trigram with more foods than the room left only adds that many of them
+        query = query.strip().lower()
+        if not query:
+            return []
+        results = list(dict.fromkeys(self._prefix_matches(self.sorted_names, query, limit)))
+        if len(results) < limit:
+            for food_id in self._prefix_matches(self.sorted_words, query, 2 * limit):
+                if food_id not in results:
+                    results.append(food_id)
+                    if len(results) == limit:
+                        break
+        if len(results) < limit and len(query) >= 3:
+            postings = sorted(filter(None, (self.trigrams.get(trigram) for trigram in self._trigrams(query))), key=len)
+            candidates = set()
+            for posting in postings:
+                room = max_candidates - len(candidates)
+                if room <= 0:
+                    break
+                candidates.update(posting if len(posting) <= room else islice(posting, room))
+            # Rank the candidates by how many of the query's trigrams they share, including the common ones
+            shared = Counter()
+            for posting in postings:
+                shared.update(candidates & posting)  # The intersection loops over the smaller set
+            for food_id, _ in shared.most_common(2 * limit):
+                if food_id not in results:
+                    results.append(food_id)
+                    if len(results) == limit:
+                        break
+        return [self.names[food_id] for food_id in results]
+
+def benchmark_search(foods=1_000_000, queries=1_000, seed=42):
+    # Time type-ahead queries (every prefix of a food name, plus a few typos) on a synthetic list of food names
+    rng = np.random.default_rng(seed)
+    kinds = ["Nuts", "Beans", "Cheese", "Bread", "Soup", "Beef", "Chicken", "Fish", "Rice", "Pasta", "Juice", "Cereal"]
+    details = ["raw", "cooked", "dried", "roasted", "canned", "frozen", "boiled", "salted", "unsalted", "fresh"]
+    names = [f"{kinds[i % len(kinds)]}, {details[(i // 7) % len(details)]} variety {i}" for i in range(foods)]
+
+    start = time.perf_counter()
+    index = FoodSearchIndex(names)
+    build_time = time.perf_counter() - start
+
+    typed = []
+    for name in rng.choice(names, queries):
+        typed.extend(name[:length] for length in range(1, len(name) + 1))
+    typos = [name[:5] + name[6] + name[5] + name[7:] for name in rng.choice(names, queries)]  # Swap two letters
+    # Typos in words most foods share, whose trigrams each match a large part of the list
+    common_typos = [text for text in ("vareity", "zzq variety", "chikcen", "unsatled") for _ in range(queries // 4)]
+
+    for label, texts in (("type-ahead", typed), ("typo", typos), ("common-word typo", common_typos)):
+        start = time.perf_counter()
+        for text in texts:
+            index.search(text)
+        print(f"{label}: {len(texts):,} queries over {foods:,} foods, {(time.perf_counter() - start) / len(texts) * 1e6:.1f} us per query")
+    print(f"index built in {build_time:.1f} s")
+
+# Binary nutrition cache: nutrition.json compiled into a file that loads with a memory map instead of a JSON parse.
+# Layout (little-endian):
+#   header (64 bytes): magic b"NUTR", format version, SHA-256 of the source JSON file, number of foods,
+#                      number of nutrients, length of the string table
+#   matrix: float64 values, foods x nutrients, in the order of NUTRIENTS
+#   string table: the food names in UTF-8, separated by NUL bytes
+# The cache is only used while the SHA-256 in its header matches the current JSON file
+
+CACHE_MAGIC = b"NUTR"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sI32sQQQ")  # magic, version, source hash, foods, nutrients, string table length
+CACHE_HEADER_SIZE = 64  # The header is padded so the matrix starts 8-byte aligned
+
+def file_hash(path):
+    # SHA-256 of a file, read in 1 MB blocks
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+def compile_nutrition_cache(json_path, cache_path=None, source_hash=None):
+    # Parse the JSON file once and write the binary cache next to it (or to cache_path). Returns the NutritionIndex
+    cache_path = cache_path or os.path.splitext(json_path)[0] + ".bin"
+    source_hash = source_hash or file_hash(json_path)
+    with open(json_path, "r") as json_file:
+        index = NutritionIndex(json.load(json_file))
+    if any("\0" in food for food in index.foods):
+        raise ValueError("Food names cannot contain NUL characters.")
+    names = "\0".join(index.foods).encode("utf-8")
+    temporary_path = cache_path + ".tmp"
+    with open(temporary_path, "wb") as cache_file:
+        header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, source_hash, len(index.foods), len(NUTRIENTS), len(names))
+        cache_file.write(header.ljust(CACHE_HEADER_SIZE, b"\0"))
+        cache_file.write(np.ascontiguousarray(index.matrix, dtype="<f8").tobytes())
+        cache_file.write(names)
+    os.replace(temporary_path, cache_path)  # Readers never see a half-written cache
+    return index
+
+def read_nutrition_cache(cache_path, source_hash=None):
+    # Memory-map a binary cache. Returns None if the file is missing, not a cache, the wrong size, or stale for source_hash
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, "rb") as cache_file:
+        header = cache_file.read(CACHE_HEADER_SIZE)
+    if len(header) < CACHE_HEADER.size:
+        return None
+    magic, version, cached_hash, foods, nutrients, names_length = CACHE_HEADER.unpack_from(header)
+    if magic != CACHE_MAGIC or version != CACHE_VERSION or nutrients != len(NUTRIENTS):
+        return None
+    if source_hash is not None and cached_hash != source_hash:
+        return None
+    if os.path.getsize(cache_path) != CACHE_HEADER_SIZE + foods * nutrients * 8 + names_length:  # Truncated or padded file
+        return None
+    matrix = np.memmap(cache_path, dtype="<f8", mode="r", offset=CACHE_HEADER_SIZE, shape=(foods, nutrients)) if foods else np.empty((0, nutrients))
+    names = np.memmap(cache_path, dtype=np.uint8, mode="r", offset=CACHE_HEADER_SIZE + matrix.nbytes, shape=(names_length,)) if names_length else b""
+    return NutritionIndex.from_columns(bytes(names).decode("utf-8").split("\0") if foods else [], matrix)
+
+def load_nutrition(json_path="nutrition.json", cache_path=None):
+    # Load the nutrition index from the binary cache when it is up to date, otherwise from the JSON file
+    # (which also rebuilds the cache)
+    cache_path = cache_path or os.path.splitext(json_path)[0] + ".bin"
+    source_hash = file_hash(json_path)
+    index = read_nutrition_cache(cache_path, source_hash)
+    if index is None:
+        index = compile_nutrition_cache(json_path, cache_path, source_hash)
+    return index
+
+def benchmark_startup(foods=500_000, seed=42):
+    # Compare loading a synthetic nutrition.json with json.load against the binary cache, first and repeat loads
+    rng = np.random.default_rng(seed)
+    directory = tempfile.mkdtemp()
+    json_path = os.path.join(directory, "nutrition.json")
+    with open(json_path, "w") as json_file:
+        json.dump({f"Food {i}, variety {i % 97}": dict(zip(NUTRIENTS, rng.uniform(0, 100, len(NUTRIENTS)).round(2).tolist()))
+                   for i in range(foods)}, json_file)
+
+    timings = []
+    for label in ("JSON (first)", "JSON (repeat)"):
+        start = time.perf_counter()
+        with open(json_path, "r") as json_file:
+            NutritionIndex(json.load(json_file))
+        timings.append((label, time.perf_counter() - start))
+    for label in ("cache miss, compiles the cache", "cache hit (first)", "cache hit (repeat)"):
+        start = time.perf_counter()
+        index = load_nutrition(json_path)
+        timings.append((label, time.perf_counter() - start))
+
+    for label, seconds in timings:
+        print(f"{label:>31}: {seconds * 1e3:8.1f} ms for {foods:,} foods")
+    del index  # Close the memory map before removing the files
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+# Load the nutrition data from the binary cache when it is up to date, otherwise from nutrition.json (which also
+# writes the cache), so a start does not parse the whole JSON file
+nutrition_index = load_nutrition('nutrition.json')
+
+def __getattr__(name):
+    # nutrition_dict (the parsed nutrition.json) is only loaded the first time it is used, e.g. by meal_totals_dict
+    if name == "nutrition_dict":
+        with open('nutrition.json', 'r') as json_file:
+            globals()["nutrition_dict"] = json.load(json_file)  # Load the JSON content into a dictionary
+        return globals()["nutrition_dict"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Display the first 3 foods of the nutrition index with their nutrient values per 100 g
+[(food, dict(zip(NUTRIENTS, nutrition_index.matrix[row].tolist()))) for row, food in enumerate(nutrition_index.foods[:3])]
 
 '''
-Sample Output of Nutrition Dict
+Sample Output of the first 3 foods
 
 [('Cornstarch',
-  {'calories': 381,
+  {'calories': 381.0,
    'total_fat': 0.1,
    'protein': 0.26,
    'carbohydrate': 91.27,
    'sugars': 0.0}),
  ('Nuts, pecans',
-  {'calories': 691,
+  {'calories': 691.0,
    'total_fat': 72.0,
    'protein': 9.17,
    'carbohydrate': 13.86,
    'sugars': 3.97}),
  ('Eggplant, raw',
-  {'calories': 25,
+  {'calories': 25.0,
    'total_fat': 0.2,
    'protein': 0.98,
    'carbohydrate': 5.88,
    'sugars': 3.53})]
 '''
+
@@ -3,45 +3,257 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-crimes = pd.read_csv("crimes.csv", dtype={"TIME OCC": str})
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-## Which hour has the highest frequency of crimes? Store as an integer variable called peak_crime_hour
+# Create bins and labels for victim age ranges
+age_bins = [0, 17, 25, 34, 44, 54, 64, np.inf]
+age_labels = ["0-17", "18-25", "26-34", "35-44", "45-54", "55-64", "65+"]
 
-# Extract the first two digits from "TIME OCC", representing the hour,
-# and convert to integer data type
-crimes["HOUR OCC"] = crimes["TIME OCC"].str[:2].astype(int)
+## One-pass aggregation cube
+## Counts of crimes by hour x area x victim age bracket (x crime code), so slice queries such as the ones above
+## are answered by indexing a small dense array instead of another pass over crimes
 
-# Preview the DataFrame to confirm the new column is correct
-crimes.head()
+class CrimeCube:
+    # Dense int64 array of counts with one labelled axis per dimension. The age bracket axis has an extra "n/a"
+    # slot for victim ages outside the bins (0, negative or missing), and the area and crime code axes have an
+    # extra unlabelled last slot for a missing AREA NAME or Crm Cd, so every crime is counted once. Per-area and
+    # per-crime code results leave that slot out, as groupby leaves out missing keys
+    def __init__(self, counts, areas, crime_codes=None):
+        self.counts = counts
+        self.hours = np.arange(24)
+        self.areas = list(areas)
+        self.age_brackets = age_labels + ["n/a"]
+        self.crime_codes = None if crime_codes is None else list(crime_codes)
+        self.area_index = {area: i for i, area in enumerate(self.areas)}
+        self.age_index = {bracket: i for i, bracket in enumerate(self.age_brackets)}
+        self.crime_code_index = None if crime_codes is None else {code: i for i, code in enumerate(self.crime_codes)}
+        # Axis labels as pandas indexes, built once for the Series returned by count(by=...)
+        self.axis_labels = {"hour": pd.Index(self.hours, name="hour"), "area": pd.Index(self.areas, name="area"), "age_bracket": pd.Index(self.age_brackets, name="age_bracket")}
+        if crime_codes is not None:
+            self.axis_labels["crime_code"] = pd.Index(self.crime_codes, name="crime_code")
+        # Marginal over crime codes, for the (common) queries that don't filter on them
+        self.counts_by_hour_area_age = counts if crime_codes is None else counts.sum(axis=3)
 
-# Produce a countplot to find the largest frequency of crimes by hour
-sns.countplot(data=crimes, x="HOUR OCC")
-plt.show()
+    @classmethod
+    def from_frame(cls, crimes):
+        # Single pass: one combined cell index per crime, counted with np.bincount
+        hours = crimes["TIME OCC"].astype(int).to_numpy() // 100
+        area_codes, areas = pd.factorize(crimes["AREA NAME"], sort=True)
+        area_codes[area_codes < 0] = len(areas)
+        ages = crimes["Vict Age"].to_numpy(dtype=float)
+        # Same intervals as pd.cut(bins=age_bins): (0, 17], (17, 25], ..., (64, inf); anything else is "n/a"
+        age_codes = np.searchsorted(age_bins, ages, side="left") - 1
+        age_codes[(age_codes < 0) | np.isnan(ages)] = len(age_labels)
+        shape = [24, len(areas) + 1, len(age_labels) + 1]
+        cells = (hours * shape[1] + area_codes) * shape[2] + age_codes
+        crime_codes = None
+        if "Crm Cd" in crimes.columns:
+            code_index, crime_codes = pd.factorize(crimes["Crm Cd"], sort=True)
+            code_index[code_index < 0] = len(crime_codes)
+            shape.append(len(crime_codes) + 1)
+            cells = cells * shape[3] + code_index
+        counts = np.bincount(cells, minlength=int(np.prod(shape))).reshape(shape)
+        return cls(counts, areas, crime_codes)
 
-# Midday has the largest volume of crime
-peak_crime_hour = 12
+    @classmethod
+    def merge(cls, cubes):
+        # Exact sum of partial cubes (e.g. one per file chunk), whose area and crime code labels may differ
+        areas = sorted(set().union(*(cube.areas for cube in cubes)))
+        has_codes = all(cube.crime_codes is not None for cube in cubes)
+        crime_codes = sorted(set().union(*(cube.crime_codes for cube in cubes))) if has_codes else None
+        shape = [24, len(areas) + 1, len(age_labels) + 1] + ([len(crime_codes) + 1] if has_codes else [])
+        counts = np.zeros(shape, dtype=np.int64)
+        area_index = {area: i for i, area in enumerate(areas)}
+        code_index = {code: i for i, code in enumerate(crime_codes)} if has_codes else None
+        for cube in cubes:
+            partial = cube.counts if has_codes else cube.counts_by_hour_area_age
+            cells = [slice(None), [area_index[area] for area in cube.areas] + [len(areas)], slice(None)]
+            if has_codes:
+                cells.append([code_index[code] for code in cube.crime_codes] + [len(crime_codes)])
+            counts[np.ix_(*(np.arange(n)[cell] for n, cell in zip(shape, cells)))] += partial
+        return cls(counts, areas, crime_codes)
 
-## Which area has the largest frequency of night crimes (crimes committed between 10pm and 3:59am)? 
-## Save as a string variable called peak_night_crime_location
-# Filter for the night-time hours
-# 0 = midnight; 3 = crimes between 3am and 3:59am, i.e., don't include 4
-night_time = crimes[crimes["HOUR OCC"].isin([22,23,0,1,2,3])]
+    @staticmethod
+    def hour_window(start, end):
+        # Hours from start to end inclusive, wrapping past midnight: hour_window(22, 3) covers 22:00-03:59
+        if start <= end:
+            return np.arange(start, end + 1)
+        return np.concatenate([np.arange(start, 24), np.arange(0, end + 1)])
 
-# Group by "AREA NAME" and count occurrences, filtering for the largest value and saving the "AREA NAME"
-peak_night_crime_location = night_time.groupby("AREA NAME", as_index=False)["HOUR OCC"].count().sort_values("HOUR OCC",
-                                                                                               ascending=False).iloc[0]["AREA NAME"]
-# Print the peak night crime location
-print(f"The area with the largest volume of night crime is {peak_night_crime_location}")
+    def count(self, by=None, hours=None, areas=None, age_brackets=None, crime_codes=None):
+        # Number of crimes matching the filters (None = no filter on that axis). hours is a list of hours or a
+        # (start, end) window; areas, age_brackets and crime_codes are lists of labels. With by="hour", "area",
+        # "age_bracket" or "crime_code" the counts are returned as a Series over that axis instead of a total
+        if isinstance(hours, tuple):
+            hours = self.hour_window(*hours)
+        selections = [
+            hours,
+            None if areas is None else [self.area_index[area] for area in areas],
+            None if age_brackets is None else [self.age_index[bracket] for bracket in age_brackets],
+        ]
+        names = ["hour", "area", "age_bracket"]
+        cube = self.counts_by_hour_area_age
+        if crime_codes is not None or by == "crime_code":
+            if self.crime_codes is None:
+                raise ValueError("this cube has no crime code axis")
+            cube = self.counts
+            selections.append(None if crime_codes is None else [self.crime_code_index[code] for code in crime_codes])
+            names.append("crime_code")
+        for axis, selection in enumerate(selections):
+            if selection is not None:
+                cube = cube.take(selection, axis=axis)
+        if by is None:
+            return int(cube.sum())
+        axis = names.index(by)
+        if by in ("area", "crime_code") and selections[axis] is None:  # Leave out the missing-label slot
+            selections[axis] = np.arange(len(self.axis_labels[by]))
+            cube = cube.take(selections[axis], axis=axis)
+        totals = cube.sum(axis=tuple(i for i in range(cube.ndim) if i != axis))
+        index = self.axis_labels[by] if selections[axis] is None else self.axis_labels[by][selections[axis]]
+        return pd.Series(totals, index=index, copy=False)
 
-## Identify the number of crimes committed against victims by age group (0-17, 18-25, 26-34, 35-44, 45-54, 55-64, 65+) 
-## Save as a pandas Series called victim_ages
-# Create bins and labels for victim age ranges
-age_bins = [0, 17, 25, 34, 44, 54, 64, np.inf]
-age_labels = ["0-17", "18-25", "26-34", "35-44", "45-54", "55-64", "65+"]
+    def peak_hour(self):
+        return int(self.counts_by_hour_area_age.sum(axis=(1, 2)).argmax())
+
+    def peak_area(self, hours=None):
+        # Area with the most crimes, optionally within an hour window such as (22, 3)
+        if isinstance(hours, tuple):
+            hours = self.hour_window(*hours)
+        by_hour_area = self.counts_by_hour_area_age.sum(axis=2)
+        if hours is not None:
+            by_hour_area = by_hour_area[hours]
+        return self.areas[int(by_hour_area.sum(axis=0)[:len(self.areas)].argmax())]
+
+    def victim_ages(self):
+        # Counts per age bracket, like crimes["Age Bracket"].value_counts()
+        totals = self.counts_by_hour_area_age.sum(axis=(0, 1))[:len(age_labels)]
+        return pd.Series(totals, index=pd.CategoricalIndex(age_labels, categories=age_labels, ordered=True, name="Age Bracket"), name="count").sort_values(ascending=False, kind="stable")
+
+def benchmark_cube(crimes, repeats=10_000):
+    # Build time of the cube and per-query time of typical slice queries
+    start = time.perf_counter()
+    cube = CrimeCube.from_frame(crimes)
+    print(f"Built {cube.counts.shape} cube from {len(crimes):,} crimes in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    some_area = cube.areas[0]
+    queries = [
+        ("peak night area", lambda: cube.peak_area((22, 3))),
+        ("crimes in area, 22:00-03:59", lambda: cube.count(hours=(22, 3), areas=[some_area])),
+        ("age brackets in area, 22:00-03:59", lambda: cube.count(by="age_bracket", hours=(22, 3), areas=[some_area])),
+    ]
+    for name, query in queries:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            query()
+        print(f"{name}: {(time.perf_counter() - start) / repeats * 1e6:.1f} us per query")
+
+## Parallel ingestion
+## crimes.csv is split into byte ranges that start and end on line boundaries. Each worker parses its range
+## (only the columns the cube needs, with TIME OCC read as an integer HHMM) into a partial CrimeCube, and the
+## partial counts are added up. This assumes no quoted field in the extract contains a newline
+CUBE_COLUMNS = ["TIME OCC", "AREA NAME", "Vict Age", "Crm Cd"]
+
+def crime_byte_ranges(path, range_size=64 * 2**20):
+    # (start, end) byte offsets covering every row after the header, each about range_size bytes
+    with open(path, "rb") as file:
+        file.readline()
+        start = file.tell()
+        size = os.path.getsize(path)
+        ranges = []
+        while start < size:
+            file.seek(min(start + range_size, size))
+            file.readline()
+            end = min(file.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def count_crime_range(path, start, end):
+    # Partial cube of the rows between byte offsets start and end
+    with open(path, "rb") as file:
+        columns = file.readline().decode().strip().split(",")
+        file.seek(start)
+        data = io.BytesIO(file.read(end - start))
+    usecols = [column for column in CUBE_COLUMNS if column in columns]
+    crimes = pd.read_csv(data, header=None, names=columns, usecols=usecols, dtype={"TIME OCC": int})
+    return CrimeCube.from_frame(crimes)
+
+def ingest_crimes(path="crimes.csv", workers=None, range_size=64 * 2**20):
+    # CrimeCube of the whole file, built from byte ranges on a pool of worker processes
+    ranges = crime_byte_ranges(path, range_size)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        partials = list(pool.map(count_crime_range, [path] * len(ranges), *zip(*ranges)))
+    return CrimeCube.merge(partials)
+
+def benchmark_ingestion(path="crimes.csv", range_size=16 * 2**20):
+    # Time to a finished cube: single-core read_csv + from_frame vs ingest_crimes with 1, 2, 4, ... workers
+    start = time.perf_counter()
+    baseline_cube = CrimeCube.from_frame(pd.read_csv(path, dtype={"TIME OCC": str}))
+    baseline = time.perf_counter() - start
+    print(f"read_csv + from_frame: {baseline:.2f}s")
+    cores = os.cpu_count()
+    workers = 1
+    while True:
+        start = time.perf_counter()
+        cube = ingest_crimes(path, workers, range_size)
+        elapsed = time.perf_counter() - start
+        assert np.array_equal(cube.counts, baseline_cube.counts)
+        print(f"ingest_crimes, {workers} of {cores} cores: {elapsed:.2f}s, {baseline / elapsed:.1f}x speed-up")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
+
+if __name__ == "__main__":
+    crimes = pd.read_csv("crimes.csv", dtype={"TIME OCC": str})
+
+    ## Which hour has the highest frequency of crimes? Store as an integer variable called peak_crime_hour
+
+    # Extract the first two digits from "TIME OCC", representing the hour,
+    # and convert to integer data type
+    crimes["HOUR OCC"] = crimes["TIME OCC"].str[:2].astype(int)
+
+    # Preview the DataFrame to confirm the new column is correct
+    crimes.head()
+
+    # Produce a countplot to find the largest frequency of crimes by hour
+    sns.countplot(data=crimes, x="HOUR OCC")
+    plt.show()
+
+    # Midday has the largest volume of crime
+    peak_crime_hour = 12
+
+    ## Which area has the largest frequency of night crimes (crimes committed between 10pm and 3:59am)? 
+    ## Save as a string variable called peak_night_crime_location
+    # Filter for the night-time hours
+    # 0 = midnight; 3 = crimes between 3am and 3:59am, i.e., don't include 4
+    night_time = crimes[crimes["HOUR OCC"].isin([22,23,0,1,2,3])]
+
+    # Group by "AREA NAME" and count occurrences, filtering for the largest value and saving the "AREA NAME"
+    peak_night_crime_location = night_time.groupby("AREA NAME", as_index=False)["HOUR OCC"].count().sort_values("HOUR OCC",
+                                                                                                   ascending=False).iloc[0]["AREA NAME"]
+    # Print the peak night crime location
+    print(f"The area with the largest volume of night crime is {peak_night_crime_location}")
+
+    ## Identify the number of crimes committed against victims by age group (0-17, 18-25, 26-34, 35-44, 45-54, 55-64, 65+) 
+    ## Save as a pandas Series called victim_ages
+
+    # Add a new column using pd.cut() to bin values into discrete intervals
+    crimes["Age Bracket"] = pd.cut(crimes["Vict Age"], bins=age_bins, labels=age_labels)
+
+    # Find the category with the largest frequency
+    victim_ages = crimes["Age Bracket"].value_counts()
+    print(victim_ages)
 
-# Add a new column using pd.cut() to bin values into discrete intervals
-crimes["Age Bracket"] = pd.cut(crimes["Vict Age"], bins=age_bins, labels=age_labels)
+    # The cube gives the same answers as the passes above
+    crime_cube = CrimeCube.from_frame(crimes)
+    print(f"Peak crime hour: {crime_cube.peak_hour()}")
+    print(f"Peak night crime location: {crime_cube.peak_area((22, 3))}")
+    print(crime_cube.victim_ages())
 
-# Find the category with the largest frequency
-victim_ages = crimes["Age Bracket"].value_counts()
-print(victim_ages)
+    # Parallel ingestion gives the same answers
+    parallel_cube = ingest_crimes()
+    assert parallel_cube.peak_hour() == crimes["HOUR OCC"].value_counts().idxmax()
+    assert parallel_cube.peak_area((22, 3)) == peak_night_crime_location
+    assert parallel_cube.victim_ages().sort_index().equals(victim_ages.sort_index())
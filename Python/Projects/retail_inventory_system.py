@@ -54,8 +54,461 @@ And, create and place orders like this:
   order_placement = order.place_order(1, 2, customer_info="John Doe")
 '''
 
+from array import array
+import asyncio
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+import os
+import pickle
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+
+import numpy as np
+
+
+class InventoryStore:
+    # The inventory store holds every product in a dict keyed by product_id (the primary index),
+    # so finding, updating and deleting a product no longer scans the whole catalogue.
+    # Two secondary indexes are maintained next to it:
+    # - by_category: category -> list of (price, product_id) tuples kept sorted by price, used for price range queries.
+    # - by_supplier: supplier -> dict of product_id -> product (a dict keeps insertion order and gives O(1) removal).
+    #
+    # Stock changes are guarded by striped locks: each product_id maps to one of lock_stripes locks,
+    # so orders for different products rarely wait on each other while orders for the same product
+    # are serialized and can never oversell. Catalogue changes (add, update, delete) also take
+    # index_lock, because they rewrite the shared secondary indexes.
+
+    def __init__(self, lock_stripes=64):
+        self.by_id = {}  # Primary index: product_id -> Product, in the order the products were added.
+        self.by_category = {}  # Secondary index: category -> sorted list of (price, product_id).
+        self.by_supplier = {}  # Secondary index: supplier -> {product_id: Product}.
+        self.stripes = [threading.Lock() for _ in range(lock_stripes)]  # Locks guarding product quantities.
+        self.index_lock = threading.Lock()  # Lock guarding the structure of the indexes.
+        self.journal = None  # InventoryJournal recording every change, attached by open_inventory().
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        # Iterate over the products in the order they were added, like the old inventory list.
+        return iter(self.by_id.values())
+
+    def __contains__(self, product_id):
+        return product_id in self.by_id
+
+    def last_product_id(self):
+        # The most recently added product is the last key of the primary index, or 0 if the store is empty.
+        return next(reversed(self.by_id)) if self.by_id else 0
+
+    def get(self, product_id):
+        # Return the product with the given ID, or None if it is not in the store.
+        return self.by_id.get(product_id)
+
+    def lock_for(self, product_id):
+        # Return the stripe lock guarding the stock of a product.
+        return self.stripes[hash(product_id) % len(self.stripes)]
+
+    def add(self, product):
+        # Add a product to the primary index and to both secondary indexes.
+        # The stripe lock is held until the add is logged, so an order for the new product cannot log its
+        # reserve before the add (or between the delete and the add of a replaced product).
+        with self.index_lock, self.lock_for(product.product_id):
+            if product.product_id in self.by_id:  # Replace an existing product with the same ID so the indexes stay consistent.
+                self._remove_locked(product.product_id)
+            self.by_id[product.product_id] = product
+            insort(self.by_category.setdefault(product.category, []), (product.price, product.product_id))
+            self.by_supplier.setdefault(product.supplier, {})[product.product_id] = product
+            self._log("add", product.product_id, product.name, product.category, product.quantity, product.price, product.supplier)
+
+    def remove(self, product_id):
+        # Remove a product from every index and return it, or return None if it is not in the store.
+        with self.index_lock:
+            return self._remove(product_id)
+
+    def update(self, product_id, quantity=None, price=None, supplier=None):
+        # Update the given fields of a product and move it in the secondary indexes if needed.
+        # Return the updated product, or None if it is not in the store.
+        with self.index_lock:
+            product = self.by_id.get(product_id)
+            if product is None:
+                return None
+            # The stripe lock keeps orders from reserving the stock meanwhile, and is held until the update is
+            # logged so that a reserve made right after it cannot be logged before it.
+            with self.lock_for(product_id):
+                if quantity is not None:
+                    product.quantity = quantity
+                if price is not None:  # The category index is sorted by price, so the entry has to be moved.
+                    self._unindex_category(product)
+                    product.price = price
+                    insort(self.by_category.setdefault(product.category, []), (product.price, product.product_id))
+                if supplier is not None:
+                    self._unindex_supplier(product)
+                    product.supplier = supplier
+                    self.by_supplier.setdefault(product.supplier, {})[product.product_id] = product
+                self._log("update", product_id, quantity, price, supplier)
+            return product
+
+    def reserve(self, product_id, quantity):
+        # Atomically take quantity units of a product out of stock.
+        # Return True if the stock was reserved, or False if the product is missing or there is not enough stock.
+        with self.lock_for(product_id):
+            product = self.get(product_id)
+            if product is None or product.quantity < quantity:
+                return False
+            product.quantity -= quantity
+            self._log("reserve", ((product_id, quantity),))
+            return True
+
+    def reserve_many(self, quantities):
+        # Atomically reserve stock for several products at once. quantities maps product_id -> total quantity.
+        # Either every product exists and has enough stock and all of them are reserved, or nothing changes.
+        stripes = self._acquire_stripes(quantities)
+        try:
+            products = [(self.get(product_id), quantity) for product_id, quantity in quantities.items()]
+            if any(product is None or product.quantity < quantity for product, quantity in products):
+                return False
+            for product, quantity in products:
+                product.quantity -= quantity
+            self._log("reserve", tuple(quantities.items()))
+            return True
+        finally:
+            for lock in stripes:
+                lock.release()
+
+    def reserve_each(self, lines):
+        # Reserve stock for each (product_id, quantity) line on its own, taking the locks once for the whole list.
+        # Return a list of booleans telling whether each line was reserved. Lines are served in order, so an
+        # earlier line can use up the stock a later line asked for.
+        # If a line raises (e.g. a quantity that is not a number), the lines reserved before it are put back,
+        # so the call changes nothing.
+        stripes = self._acquire_stripes(product_id for product_id, _ in lines)
+        try:
+            results, reserved = [], []
+            try:
+                for product_id, quantity in lines:
+                    product = self.get(product_id)
+                    if product is None or product.quantity < quantity:
+                        results.append(False)
+                    else:
+                        product.quantity -= quantity
+                        reserved.append((product_id, quantity))
+                        results.append(True)
+            except Exception:
+                for product_id, quantity in reserved:
+                    self.get(product_id).quantity += quantity
+                raise
+            if reserved:
+                self._log("reserve", tuple(reserved))
+            return results
+        finally:
+            for lock in stripes:
+                lock.release()
+
+    def in_category(self, category, min_price=None, max_price=None):
+        # Return the products of a category whose price lies between min_price and max_price (both inclusive).
+        # The category index is sorted by price, so the bounds are found with a binary search
+        # and only the matching products are visited.
+        entries = self.by_category.get(category, [])
+        low = 0 if min_price is None else bisect_left(entries, (min_price,))
+        high = len(entries) if max_price is None else bisect_right(entries, (max_price, float("inf")))
+        return [self.by_id[product_id] for _, product_id in entries[low:high]]
+
+    def from_supplier(self, supplier, min_price=None, max_price=None):
+        # Return the products of a supplier whose price lies between min_price and max_price (both inclusive).
+        return [
+            product for product in self.by_supplier.get(supplier, {}).values()
+            if (min_price is None or product.price >= min_price) and (max_price is None or product.price <= max_price)
+        ]
+
+    def snapshot_state(self):
+        # Return the products as a list of row tuples, to be saved in a snapshot by InventoryJournal.
+        return [(p.product_id, p.name, p.category, p.quantity, p.price, p.supplier) for p in self.by_id.values()]
+
+    def restore_state(self, state):
+        # Load the products saved by snapshot_state(). This store must be Product.inventory, because every
+        # Product registers itself there when it is created.
+        for row in state:
+            Product(*row)
+
+    def _acquire_stripes(self, product_ids):
+        # Acquire the stripe locks of several products and return them. The locks are always taken in the same
+        # (sorted) order so two batches can never deadlock.
+        stripes = [self.stripes[i] for i in sorted({hash(product_id) % len(self.stripes) for product_id in product_ids})]
+        for lock in stripes:
+            lock.acquire()
+        return stripes
+
+    def _log(self, kind, *args):
+        # Record a change in the journal, if one is attached. The caller holds the locks guarding the change,
+        # so the journal sees the changes to each product in the order they happened.
+        if self.journal is not None:
+            self.journal.record(kind, *args)
+
+    def _remove(self, product_id):
+        # Remove a product from every index. The caller must hold index_lock.
+        with self.lock_for(product_id):  # Wait for any order that is reserving this product.
+            return self._remove_locked(product_id)
+
+    def _remove_locked(self, product_id):
+        # Same as _remove, for a caller that already holds index_lock and the product's stripe lock.
+        product = self.by_id.pop(product_id, None)
+        if product is not None:
+            self._unindex_category(product)
+            self._unindex_supplier(product)
+            self._log("delete", product_id)
+        return product
+
+    def _unindex_category(self, product):
+        entries = self.by_category[product.category]
+        del entries[bisect_left(entries, (product.price, product.product_id))]
+        if not entries:  # Drop empty categories so the index does not keep growing.
+            del self.by_category[product.category]
+
+    def _unindex_supplier(self, product):
+        products = self.by_supplier[product.supplier]
+        del products[product.product_id]
+        if not products:  # Drop empty suppliers so the index does not keep growing.
+            del self.by_supplier[product.supplier]
+
+
+class ColumnarInventoryStore(InventoryStore):
+    # A memory-compact inventory store for very large catalogues, used in place of the default store with
+    # Product.inventory = ColumnarInventoryStore().
+    # Instead of keeping one Product object per product, every field is stored in its own column:
+    # - product_id, quantity and price live in typed arrays (8 bytes per product each).
+    # - category and supplier are dictionary-encoded: each column holds an integer code into a list of distinct values.
+    # - names are stored back to back as UTF-8 bytes, with an array of offsets.
+    # Products returned by get() and by iteration are ProductView objects created on demand, which read and write
+    # the columns directly. Deleted products are only marked as not alive, so rows never move.
+    # Products must be added with increasing IDs (as add_product does), so the ID column stays sorted and is
+    # searched with a binary search instead of a dict. Unlike the default store, the ID of a deleted last
+    # product is not reused.
+
+    def __init__(self, lock_stripes=64):
+        super().__init__(lock_stripes)
+        self.ids = array("q")  # Column of product IDs, in increasing order.
+        self.quantities = array("q")  # Column of quantities.
+        self.prices = array("d")  # Column of prices.
+        self.category_codes = array("i")  # Column of codes into self.categories.
+        self.supplier_codes = array("i")  # Column of codes into self.suppliers.
+        self.alive = bytearray()  # 1 for products in the store, 0 for deleted products.
+        self.name_bytes = bytearray()  # All product names, UTF-8 encoded and stored back to back.
+        self.name_offsets = array("q", [0])  # The name of row i is name_bytes[name_offsets[i]:name_offsets[i + 1]].
+        self.categories, self.category_codes_by_value = [], {}  # Dictionary of distinct categories.
+        self.suppliers, self.supplier_codes_by_value = [], {}  # Dictionary of distinct suppliers.
+        self.count = 0  # Number of products in the store (deleted products excluded).
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # Iterate over the products in the order they were added.
+        return (ProductView(self, row) for row in range(len(self.ids)) if self.alive[row])
+
+    def __contains__(self, product_id):
+        return self._row(product_id) is not None
+
+    def last_product_id(self):
+        # The ID column is sorted, so the largest ID ever added is the last one.
+        return self.ids[-1] if self.ids else 0
+
+    def get(self, product_id):
+        # Return a view of the product with the given ID, or None if it is not in the store.
+        row = self._row(product_id)
+        return None if row is None else ProductView(self, row)
+
+    def add(self, product):
+        # Copy the fields of a product into the columns. The product object itself is not kept.
+        with self.index_lock, self.lock_for(product.product_id):  # Held until the add is logged, as in InventoryStore.add.
+            if self.ids and product.product_id <= self.ids[-1]:
+                raise ValueError("Products must be added to a columnar inventory with increasing product IDs.")
+            self.ids.append(product.product_id)
+            self.quantities.append(product.quantity)
+            self.prices.append(product.price)
+            self.category_codes.append(self._encode(product.category, self.categories, self.category_codes_by_value))
+            self.supplier_codes.append(self._encode(product.supplier, self.suppliers, self.supplier_codes_by_value))
+            self.alive.append(1)
+            self.name_bytes += product.name.encode()
+            self.name_offsets.append(len(self.name_bytes))
+            self.count += 1
+            self._log("add", product.product_id, product.name, product.category, product.quantity, product.price, product.supplier)
+
+    def update(self, product_id, quantity=None, price=None, supplier=None):
+        # Update the given fields of a product in place. Return a view of the product, or None if it is not in the store.
+        with self.index_lock:
+            row = self._row(product_id)
+            if row is None:
+                return None
+            with self.lock_for(product_id):  # Held until the update is logged, as in InventoryStore.update.
+                if quantity is not None:
+                    self.quantities[row] = quantity
+                if price is not None:
+                    self.prices[row] = price
+                if supplier is not None:
+                    self.supplier_codes[row] = self._encode(supplier, self.suppliers, self.supplier_codes_by_value)
+                self._log("update", product_id, quantity, price, supplier)
+            return ProductView(self, row)
+
+    def in_category(self, category, min_price=None, max_price=None):
+        # Return the products of a category whose price lies between min_price and max_price (both inclusive).
+        # The columns are scanned with vectorized NumPy comparisons instead of a per-product loop.
+        code = self.category_codes_by_value.get(category)
+        if code is None:
+            return []
+        with self.index_lock:  # The arrays cannot grow while NumPy views of them exist.
+            mask = self._alive_mask() & (np.frombuffer(self.category_codes, dtype=np.intc) == code)
+            mask &= self._price_mask(min_price, max_price)
+            rows = np.flatnonzero(mask)
+        return [ProductView(self, int(row)) for row in rows]
+
+    def from_supplier(self, supplier, min_price=None, max_price=None):
+        # Return the products of a supplier whose price lies between min_price and max_price (both inclusive).
+        code = self.supplier_codes_by_value.get(supplier)
+        if code is None:
+            return []
+        with self.index_lock:  # The arrays cannot grow while NumPy views of them exist.
+            mask = self._alive_mask() & (np.frombuffer(self.supplier_codes, dtype=np.intc) == code)
+            mask &= self._price_mask(min_price, max_price)
+            rows = np.flatnonzero(mask)
+        return [ProductView(self, int(row)) for row in rows]
+
+    def stock_value_by_category(self):
+        # Return the total stock value (quantity * price) of each category, computed over whole columns at once.
+        with self.index_lock:
+            if not self.ids:
+                return {}
+            values = np.frombuffer(self.quantities, dtype=np.int64) * np.frombuffer(self.prices, dtype=np.float64)
+            values *= self._alive_mask()
+            totals = np.bincount(np.frombuffer(self.category_codes, dtype=np.intc), weights=values, minlength=len(self.categories))
+        return {category: float(total) for category, total in zip(self.categories, totals)}
+
+    def stock_by_supplier(self):
+        # Return the total quantity in stock from each supplier, computed over whole columns at once.
+        with self.index_lock:
+            if not self.ids:
+                return {}
+            quantities = np.frombuffer(self.quantities, dtype=np.int64) * self._alive_mask()
+            totals = np.bincount(np.frombuffer(self.supplier_codes, dtype=np.intc), weights=quantities, minlength=len(self.suppliers))
+        return {supplier: int(total) for supplier, total in zip(self.suppliers, totals)}
+
+    def memory_report(self):
+        # Return the number of bytes used by the columns and dictionaries, in total and per product.
+        columns = [self.ids, self.quantities, self.prices, self.category_codes, self.supplier_codes,
+                   self.alive, self.name_bytes, self.name_offsets]
+        dictionaries = [self.categories, self.category_codes_by_value, self.suppliers, self.supplier_codes_by_value]
+        total = sum(sys.getsizeof(column) for column in columns) + sum(sys.getsizeof(dictionary) for dictionary in dictionaries)
+        total += sum(sys.getsizeof(value) for value in self.categories + self.suppliers)
+        return {"products": self.count, "bytes": total, "bytes_per_product": total / max(self.count, 1)}
+
+    def snapshot_state(self):
+        # Return the columns and dictionaries as they are. Arrays pickle as raw bytes, so the snapshot is
+        # compact and loads without creating an object per product.
+        return (self.ids, self.quantities, self.prices, self.category_codes, self.supplier_codes, self.alive,
+                self.name_bytes, self.name_offsets, self.categories, self.suppliers, self.count)
+
+    def restore_state(self, state):
+        # Load the columns and dictionaries saved by snapshot_state().
+        (self.ids, self.quantities, self.prices, self.category_codes, self.supplier_codes, self.alive,
+         self.name_bytes, self.name_offsets, self.categories, self.suppliers, self.count) = state
+        self.category_codes_by_value = {category: code for code, category in enumerate(self.categories)}
+        self.supplier_codes_by_value = {supplier: code for code, supplier in enumerate(self.suppliers)}
+
+    def _row(self, product_id):
+        # Find the row of a product with a binary search over the sorted ID column.
+        row = bisect_left(self.ids, product_id)
+        if row < len(self.ids) and self.ids[row] == product_id and self.alive[row]:
+            return row
+        return None
+
+    def _remove(self, product_id):
+        # Mark a product as deleted. The caller must hold index_lock.
+        with self.lock_for(product_id):  # Wait for any order that is reserving this product.
+            row = self._row(product_id)
+            if row is None:
+                return None
+            self.alive[row] = 0
+            self.count -= 1
+            self._log("delete", product_id)
+        return ProductView(self, row)
+
+    def _alive_mask(self):
+        return np.frombuffer(self.alive, dtype=np.bool_)
+
+    def _price_mask(self, min_price, max_price):
+        prices = np.frombuffer(self.prices, dtype=np.float64)
+        mask = np.ones(len(prices), dtype=np.bool_)
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+        return mask
+
+    @staticmethod
+    def _encode(value, values, codes_by_value):
+        # Return the dictionary code of a value, adding it to the dictionary the first time it is seen.
+        code = codes_by_value.get(value)
+        if code is None:
+            code = codes_by_value[value] = len(values)
+            values.append(value)
+        return code
+
+
+class ProductView:
+    # A lightweight view of one product in a ColumnarInventoryStore. It has the same attributes as a Product,
+    # but it only holds a reference to the store and a row number, and uses __slots__ so it has no __dict__.
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store  # The ColumnarInventoryStore holding the product.
+        self.row = row  # The row of the product in the store's columns.
+
+    @property
+    def product_id(self):
+        return self.store.ids[self.row]
+
+    @property
+    def name(self):
+        start, end = self.store.name_offsets[self.row], self.store.name_offsets[self.row + 1]
+        return self.store.name_bytes[start:end].decode()
+
+    @property
+    def category(self):
+        return self.store.categories[self.store.category_codes[self.row]]
+
+    @property
+    def quantity(self):
+        return self.store.quantities[self.row]
+
+    @quantity.setter
+    def quantity(self, quantity):
+        self.store.quantities[self.row] = quantity
+
+    @property
+    def price(self):
+        return self.store.prices[self.row]
+
+    @price.setter
+    def price(self, price):
+        self.store.prices[self.row] = price
+
+    @property
+    def supplier(self):
+        return self.store.suppliers[self.store.supplier_codes[self.row]]
+
+    def __repr__(self):
+        return f"ProductView(product_id={self.product_id}, name={self.name!r}, category={self.category!r}, " \
+               f"quantity={self.quantity}, price={self.price}, supplier={self.supplier!r})"
+
+
 class Product:
-    inventory = []  # Class-level variable to store all products. This is shared among all instances of Product.
+    inventory = InventoryStore()  # Class-level store holding all products. This is shared among all instances of Product.
 
     def __init__(self, product_id, name, category, quantity, price, supplier):
         # The __init__ method is the constructor. It initializes a new instance of the Product class.
@@ -65,37 +518,43 @@ class Product:
         self.quantity = quantity  # Instance variable to store the quantity of the product.
         self.price = price  # Instance variable to store the price of the product.
         self.supplier = supplier  # Instance variable to store the supplier of the product.
-        Product.inventory.append(self)  # Add this new product instance to the class-level inventory list.
+        Product.inventory.add(self)  # Add this new product instance to the class-level inventory store.
 
     @classmethod
     def add_product(cls, name, category, quantity, price, supplier):
         # This is a class method that adds a new product to the inventory.
-        product_id = cls.inventory[-1].product_id + 1 if len(cls.inventory)>0 else 1  # Generate a new product ID by counting existing products and adding 1.
+        product_id = cls.inventory.last_product_id() + 1  # Generate a new product ID from the last product added.
         new_product = cls(product_id, name, category, quantity, price, supplier)  # Create a new product instance.
         return "Product added successfully"  # Return a confirmation message.
 
     @classmethod
     def update_product(cls, product_id, quantity=None, price=None, supplier=None):
         # This class method updates the details of an existing product.
-        for product in cls.inventory:  # Loop through the inventory to find the product with the given ID.
-            if product.product_id == product_id:  # Check if this is the product we want to update.
-                if quantity is not None:  # If a new quantity is provided, update it.
-                    product.quantity = quantity
-                if price is not None:  # If a new price is provided, update it.
-                    product.price = price
-                if supplier is not None:  # If a new supplier is provided, update it.
-                    product.supplier = supplier
-                return "Product information updated successfully"  # Return a confirmation message.
-        return "Product not found"  # If the product ID was not found, return this message.
+        # The store looks the product up by ID and only updates the parameters that have a value.
+        if cls.inventory.update(product_id, quantity=quantity, price=price, supplier=supplier) is None:
+            return "Product not found"  # If the product ID was not found, return this message.
+        return "Product information updated successfully"  # Return a confirmation message.
 
     @classmethod
     def delete_product(cls, product_id):
         # This class method deletes a product from the inventory.
-        for i, product in enumerate(cls.inventory):  # Loop through the inventory with index to find the product.
-            if product.product_id == product_id:  # Check if this is the product we want to delete.
-                del cls.inventory[i]  # Delete the product from the inventory list.
-                return "Product deleted successfully"  # Return a confirmation message.
-        return "Product not found"  # If the product ID was not found, return this message.
+        if cls.inventory.remove(product_id) is None:
+            return "Product not found"  # If the product ID was not found, return this message.
+        return "Product deleted successfully"  # Return a confirmation message.
+
+    @classmethod
+    def find_products(cls, category=None, supplier=None, min_price=None, max_price=None):
+        # This class method returns the products matching a category and/or supplier within a price range,
+        # e.g. Product.find_products(category="Electronics", max_price=500).
+        if category is not None:  # The category index answers the price range with a binary search.
+            products = cls.inventory.in_category(category, min_price, max_price)
+            return [product for product in products if supplier is None or product.supplier == supplier]
+        if supplier is not None:
+            return cls.inventory.from_supplier(supplier, min_price, max_price)
+        return [
+            product for product in cls.inventory
+            if (min_price is None or product.price >= min_price) and (max_price is None or product.price <= max_price)
+        ]
 
 
 class Order:
@@ -107,11 +566,616 @@ class Order:
 
     def place_order(self, product_id, quantity, customer_info=None):
         # This method adds a product to the order.
-        for product in Product.inventory:
-            if product.product_id == product_id and product.quantity >= quantity: # Check that the product exist in the inventory and that there's stock
-                product.quantity -= quantity  # Update the stock of the product by reducing it by the ordered quantity
-                self.products.append((product_id, quantity))  # Add the product and quantity as a tuple to the order's products list.
-                if customer_info:  # If customer information is provided, update it.
-                    self.customer_info = customer_info
-                return f"Order placed successfully. Order ID: {self.order_id}"  # Return a confirmation message with the order ID.
+        # The store checks that the product exists and has enough stock, and reduces the stock by the ordered
+        # quantity, as one atomic step so concurrent orders can never oversell.
+        if Product.inventory.reserve(product_id, quantity):
+            self.products.append((product_id, quantity))  # Add the product and quantity as a tuple to the order's products list.
+            if customer_info:  # If customer information is provided, update it.
+                self.customer_info = customer_info
+            if Product.inventory.journal is not None:  # Record the order so it survives a restart.
+                Product.inventory.journal.record_order(self, [(product_id, quantity)])
+            return f"Order placed successfully. Order ID: {self.order_id}"  # Return a confirmation message with the order ID.
         return "Order could not be placed. Product not found or insufficient quantity."
+
+    def place_orders(self, lines, customer_info=None):
+        # This method adds several products to the order at once. lines is a list of (product_id, quantity) tuples.
+        # Either every line is placed or, if any product is missing or short of stock, none of them is.
+        if not place_many([(self, lines)]):
+            return "Order could not be placed. Product not found or insufficient quantity."
+        if customer_info:  # If customer information is provided, update it.
+            self.customer_info = customer_info
+            if Product.inventory.journal is not None:  # The lines were recorded by place_many, only the customer changed.
+                Product.inventory.journal.record_order(self, [])
+        return f"Order placed successfully. Order ID: {self.order_id}"
+
+
+def place_many(orders):
+    # Place many orders as a single all-or-nothing batch. orders is a list of (order, lines) tuples, where lines
+    # is a list of (product_id, quantity) tuples. The lines are grouped by product and the stock is checked and
+    # reserved for the whole batch in one pass. Return True if every line was placed, or False if nothing was.
+    quantities = {}
+    for _, lines in orders:
+        for product_id, quantity in lines:
+            if quantity < 0:  # A negative line would hide a shortage in the aggregated quantity.
+                return False
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not Product.inventory.reserve_many(quantities):
+        return False
+    for order, lines in orders:
+        order.products.extend(lines)  # Add the (product_id, quantity) tuples to each order's products list.
+        if Product.inventory.journal is not None:  # Record the order so it survives a restart.
+            Product.inventory.journal.record_order(order, lines)
+    return True
+
+
+class InventoryJournal:
+    # Makes the inventory and the orders durable. Every change is appended to a write-ahead log file
+    # (inventory.log) and a compact binary snapshot of the whole state (inventory.snapshot) is written from
+    # time to time, after which the log starts again empty.
+    #
+    # Each log record is a pickled tuple (sequence number, kind, arguments...), prefixed with its length and a
+    # CRC32 checksum, so a record cut short by a crash is detected and dropped on recovery. Records are written
+    # in groups of group_commit (group commit): the whole group is written and fsync'ed at once, so a change is
+    # durable once its group has been committed. A background thread also commits whatever is pending every
+    # max_delay seconds, so at low traffic a change is durable at most max_delay seconds after it was made;
+    # commit() makes it durable straight away. Every snapshot stores the sequence number of the last change
+    # it contains, and recovery loads the snapshot and then replays only the log records that come after it.
+    #
+    # The journal keeps its own copy of every order it has recorded (self.orders), which is what recovery
+    # rebuilds, because Order objects are not stored anywhere else.
+
+    def __init__(self, directory, group_commit=64, max_delay=0.05):
+        self.directory = directory  # Directory holding the log and snapshot files.
+        self.log_path = os.path.join(directory, "inventory.log")
+        self.snapshot_path = os.path.join(directory, "inventory.snapshot")
+        self.group_commit = group_commit  # Number of records written and fsync'ed together.
+        self.max_delay = max_delay  # Longest time in seconds a record waits for its group to fill before it is committed.
+        self.lock = threading.Lock()  # Lock guarding the sequence number, the pending records and the log file.
+        self.sequence = 0  # Sequence number of the last record.
+        self.pending = []  # Encoded records waiting for the next group commit.
+        self.orders = {}  # order_id -> Order, the journal's copy of every recorded order.
+        self.skipped_records = 0  # Number of replayed changes skipped because their product was unknown.
+        self.store = None  # The inventory store being recorded, set by recover().
+        self.log_file = None
+        self.snapshot_thread = None
+        self.stop_snapshots = threading.Event()
+        self.commit_thread = None
+        self.stop_commits = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, kind, *args):
+        # Append a change to the log. The caller holds the store locks guarding the change.
+        with self.lock:
+            self._append(kind, *args)
+
+    def record_order(self, order, lines):
+        # Append order lines (a list of (product_id, quantity) tuples) and the current customer_info of an order.
+        with self.lock:
+            self._apply_order(order.order_id, list(lines), order.customer_info)
+            self._append("order", order.order_id, list(lines), order.customer_info)
+
+    def commit(self):
+        # Write and fsync the pending records now, without waiting for a full group.
+        with self.lock:
+            self._commit()
+
+    def recover(self):
+        # Rebuild Product.inventory (expected to be empty) and self.orders from the latest snapshot and the log tail,
+        # then start recording the changes made to Product.inventory.
+        self.store = Product.inventory
+        snapshot_sequence = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as snapshot_file:
+                snapshot = pickle.load(snapshot_file)
+            snapshot_sequence = snapshot["sequence"]
+            self.store.restore_state(snapshot["products"])
+            for order_id, lines, customer_info in snapshot["orders"]:
+                self._apply_order(order_id, lines, customer_info)
+        self.sequence = snapshot_sequence
+        valid_length = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as log_file:
+                data = log_file.read()
+            for record, valid_length in self._read_records(data):
+                if record[0] > snapshot_sequence:  # Older records are already part of the snapshot.
+                    self._replay(record)
+                    self.sequence = record[0]
+        with open(self.log_path, "ab") as log_file:
+            log_file.truncate(valid_length)  # Drop a record cut short by a crash.
+        self.log_file = open(self.log_path, "ab")
+        self.store.journal = self
+        if self.max_delay:
+            self.commit_thread = threading.Thread(target=self._commit_periodically, daemon=True)
+            self.commit_thread.start()
+
+    def snapshot(self):
+        # Write a snapshot of the whole inventory and all orders, then empty the log.
+        # Every lock of the store is held meanwhile, so the snapshot matches the sequence number exactly.
+        with self.store.index_lock:
+            for lock in self.store.stripes:
+                lock.acquire()
+            try:
+                with self.lock:
+                    snapshot = {
+                        "sequence": self.sequence,
+                        "products": self.store.snapshot_state(),
+                        "orders": [(order.order_id, order.products, order.customer_info) for order in self.orders.values()],
+                    }
+                    temporary_path = self.snapshot_path + ".tmp"
+                    with open(temporary_path, "wb") as snapshot_file:
+                        pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+                        snapshot_file.flush()
+                        os.fsync(snapshot_file.fileno())
+                    os.replace(temporary_path, self.snapshot_path)  # The new snapshot replaces the old one atomically.
+                    self.pending.clear()  # The pending records are part of the snapshot.
+                    self.log_file.truncate(0)
+            finally:
+                for lock in self.store.stripes:
+                    lock.release()
+
+    def start_snapshots(self, interval):
+        # Write a snapshot every interval seconds from a background thread.
+        def take_snapshots():
+            while not self.stop_snapshots.wait(interval):
+                self.snapshot()
+
+        self.snapshot_thread = threading.Thread(target=take_snapshots, daemon=True)
+        self.snapshot_thread.start()
+
+    def close(self):
+        # Stop the snapshots and the periodic commits, commit the pending records and stop recording.
+        self.stop_snapshots.set()
+        self.stop_commits.set()
+        for thread in (self.snapshot_thread, self.commit_thread):
+            if thread is not None:
+                thread.join()
+        with self.lock:
+            self._commit()
+            self.log_file.close()
+        self.store.journal = None
+
+    def _append(self, kind, *args):
+        # Encode a record and commit the group once it is full. The caller holds self.lock.
+        self.sequence += 1
+        payload = pickle.dumps((self.sequence, kind) + args, protocol=pickle.HIGHEST_PROTOCOL)
+        self.pending.append(struct.pack(">II", len(payload), zlib.crc32(payload)) + payload)
+        if len(self.pending) >= self.group_commit:
+            self._commit()
+
+    def _commit(self):
+        # Write the pending records and fsync the log. The caller holds self.lock.
+        if self.pending:
+            self.log_file.write(b"".join(self.pending))
+            self.pending.clear()
+            self.log_file.flush()
+            os.fsync(self.log_file.fileno())
+
+    def _commit_periodically(self):
+        # Commit the pending records every max_delay seconds, so a group that never fills is still written.
+        while not self.stop_commits.wait(self.max_delay):
+            with self.lock:
+                self._commit()
+
+    def _apply_order(self, order_id, lines, customer_info):
+        order = self.orders.get(order_id)
+        if order is None:
+            order = self.orders[order_id] = Order(order_id, [], customer_info)
+        order.products.extend(lines)
+        if customer_info:
+            order.customer_info = customer_info
+
+    def _replay(self, record):
+        # Apply one log record to the store. The journal is not attached yet, so nothing is recorded again.
+        _, kind, *args = record
+        if kind == "add":
+            Product(*args)
+        elif kind == "update":
+            self.store.update(*args)
+        elif kind == "delete":
+            self.store.remove(args[0])
+        elif kind == "reserve":
+            for product_id, quantity in args[0]:
+                product = self.store.get(product_id)
+                if product is None:  # A record for a product the log never added: skip it rather than fail recovery.
+                    self.skipped_records += 1
+                    continue
+                product.quantity -= quantity
+        elif kind == "order":
+            self._apply_order(*args)
+
+    @staticmethod
+    def _read_records(data):
+        # Yield each complete record of the log with the offset where it ends, stopping at the first record
+        # that is cut short or fails its checksum.
+        offset = 0
+        while offset + 8 <= len(data):
+            length, checksum = struct.unpack_from(">II", data, offset)
+            payload = data[offset + 8:offset + 8 + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                return
+            offset += 8 + length
+            yield pickle.loads(payload), offset
+
+
+def open_inventory(directory, store=None, group_commit=64, snapshot_interval=None, max_delay=0.05):
+    # Recover the inventory saved in directory into store (a new InventoryStore by default), make it
+    # Product.inventory and record every change to it from now on. Return the InventoryJournal;
+    # the recovered orders are in its orders dict.
+    journal = InventoryJournal(directory, group_commit, max_delay)
+    Product.inventory = store if store is not None else InventoryStore()
+    journal.recover()
+    if snapshot_interval:
+        journal.start_snapshots(snapshot_interval)
+    return journal
+
+
+class OrderIntakeService:
+    # An asyncio front end for placing orders that arrive as a stream from several producers.
+    # Orders wait in a bounded queue: when it is full, submit() makes the producer wait (backpressure) and
+    # try_submit() rejects the order straight away (load shedding). A worker takes the orders off the queue in
+    # micro-batches of up to batch_size, waiting at most max_wait seconds to fill a batch, and reserves the stock
+    # of the whole batch with a single InventoryStore.reserve_each() call. Each order still succeeds or fails on
+    # its own, with the same messages as Order.place_order, and the time from submission to result of the most
+    # recent max_latencies orders is kept.
+
+    def __init__(self, max_queue=10_000, batch_size=256, max_wait=0.002, max_latencies=100_000):
+        self.queue = asyncio.Queue(max_queue)  # Bounded queue of (order, product_id, quantity, customer_info, future, submitted).
+        self.batch_size = batch_size  # Largest number of orders reserved together.
+        self.max_wait = max_wait  # Longest time in seconds the worker waits to fill a batch.
+        self.latencies = deque(maxlen=max_latencies)  # Seconds from submission to result of the latest processed orders.
+        self.rejected = 0  # Number of orders rejected by try_submit() because the queue was full.
+        self.workers = []
+
+    def start(self, workers=1):
+        # Start the worker tasks. Must be called from a running event loop.
+        self.workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+
+    async def stop(self):
+        # Wait for the queued orders to be processed, then stop the workers.
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+    async def submit(self, order, product_id, quantity, customer_info=None):
+        # Queue an order, waiting while the queue is full, and return the place_order message once it is processed.
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((order, product_id, quantity, customer_info, future, time.perf_counter()))
+        return await future
+
+    def try_submit(self, order, product_id, quantity, customer_info=None):
+        # Queue an order without waiting. Return a future for the place_order message, or None if the queue is full.
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((order, product_id, quantity, customer_info, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return None
+        return future
+
+    def latency_percentiles(self):
+        # Return the p50, p90, p99 and maximum latency in milliseconds of the latest processed orders.
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {}
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1e3
+        return {"p50": percentile(50), "p90": percentile(90), "p99": percentile(99), "max": latencies[-1] * 1e3}
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                try:
+                    results = self._reserve(batch)
+                except Exception:
+                    # A bad order (e.g. a non-numeric quantity) fails the whole reserve_each call, which gives back
+                    # the stock it already reserved, so reserve the orders one by one and fail only the futures of
+                    # the orders that raise. The worker keeps running either way.
+                    for entry in batch:
+                        try:
+                            reserved = self._reserve([entry])
+                        except Exception as error:
+                            future = entry[4]
+                            if not future.done():
+                                future.set_exception(error)
+                        else:
+                            self._finish([entry], reserved)
+                else:
+                    self._finish(batch, results)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _reserve(self, batch):
+        # Reserve the stock for a batch of orders. Return one bool per order, as reserve_each does.
+        return Product.inventory.reserve_each([(product_id, quantity) for _, product_id, quantity, _, _, _ in batch])
+
+    def _finish(self, batch, results):
+        # Resolve each order's future with its place_order message once its stock is reserved (or not).
+        # An order whose bookkeeping raises (e.g. the journal write fails) fails on its own and is not
+        # retried, so its stock is never reserved twice.
+        journal = Product.inventory.journal
+        finished = time.perf_counter()
+        for (order, product_id, quantity, customer_info, future, submitted), reserved in zip(batch, results):
+            try:
+                if reserved:
+                    order.products.append((product_id, quantity))
+                    if customer_info:
+                        order.customer_info = customer_info
+                    if journal is not None:  # Record the order so it survives a restart.
+                        journal.record_order(order, [(product_id, quantity)])
+                    message = f"Order placed successfully. Order ID: {order.order_id}"
+                else:
+                    message = "Order could not be placed. Product not found or insufficient quantity."
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+                continue
+            self.latencies.append(finished - submitted)
+            if not future.done():  # The producer may have given up waiting.
+                future.set_result(message)
+
+
+async def run_intake_load(producers=8, orders_per_producer=25_000, in_flight=500, products=1_000, seed=42, **service_options):
+    # A local load generator for OrderIntakeService: several producers each keep up to in_flight orders
+    # waiting for a result while they submit orders for random products. Return a report of the sustained
+    # orders per second and the latency percentiles.
+    saved_inventory = Product.inventory
+    try:
+        Product.inventory = InventoryStore()
+        for i in range(products):
+            Product.add_product(f"Item {i}", "Stream", producers * orders_per_producer, 10, "Supplier A")
+        service = OrderIntakeService(**service_options)
+        service.start()
+
+        async def produce(producer_id):
+            rng = random.Random(seed + producer_id)
+            order = Order(order_id=producer_id, products=[])
+            window = asyncio.Semaphore(in_flight)
+
+            async def place(product_id, quantity):
+                try:
+                    await service.submit(order, product_id, quantity)
+                finally:
+                    window.release()
+
+            tasks = []
+            for _ in range(orders_per_producer):
+                await window.acquire()
+                tasks.append(asyncio.create_task(place(rng.randint(1, products), rng.randint(1, 3))))
+            await asyncio.gather(*tasks)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(produce(i) for i in range(producers)))
+        elapsed = time.perf_counter() - start
+        await service.stop()
+        report = {"orders": producers * orders_per_producer, "seconds": elapsed,
+                  "orders_per_second": producers * orders_per_producer / elapsed}
+        report.update(service.latency_percentiles())
+        return report
+    finally:
+        Product.inventory = saved_inventory
+
+
+def benchmark_intake(batch_sizes=(1, 32, 256)):
+    # Run the intake load generator with several micro-batch sizes and print the throughput and latencies.
+    for batch_size in batch_sizes:
+        report = asyncio.run(run_intake_load(batch_size=batch_size))
+        print(f"batch size {batch_size:>3}: {report['orders_per_second']:,.0f} orders/s, "
+              f"p50 {report['p50']:.2f} ms, p99 {report['p99']:.2f} ms, max {report['max']:.2f} ms")
+
+
+def benchmark_inventory(sizes=(10_000, 100_000, 1_000_000), lookups=1_000, queries=20, seed=42):
+    # Compare the old list scan with the indexed inventory store at several catalogue sizes.
+    # Two operations are timed: looking a product up by ID (what update, delete and place_order do)
+    # and a range query ("all products in category X under price Y").
+    rng = random.Random(seed)
+    categories = [f"Category {i}" for i in range(50)]
+    suppliers = [f"Supplier {i}" for i in range(200)]
+    saved_inventory = Product.inventory
+    try:
+        for size in sizes:
+            Product.inventory = InventoryStore()
+            for _ in range(size):
+                Product.add_product("Item", rng.choice(categories), rng.randint(0, 100), round(rng.uniform(1, 1000), 2), rng.choice(suppliers))
+            products = list(Product.inventory)  # The same catalogue as the old list-based inventory.
+
+            # The list scan gets fewer lookups on large catalogues so the benchmark finishes in reasonable time.
+            scan_ids = [rng.randint(1, size) for _ in range(max(10, lookups * 10_000 // size))]
+            start = time.perf_counter()
+            for product_id in scan_ids:
+                for product in products:
+                    if product.product_id == product_id:
+                        break
+            scan_lookup = (time.perf_counter() - start) / len(scan_ids)
+
+            index_ids = [rng.randint(1, size) for _ in range(lookups)]
+            start = time.perf_counter()
+            for product_id in index_ids:
+                Product.inventory.get(product_id)
+            index_lookup = (time.perf_counter() - start) / len(index_ids)
+
+            range_queries = [(rng.choice(categories), rng.uniform(1, 100)) for _ in range(queries)]
+            start = time.perf_counter()
+            for category, max_price in range_queries:
+                [product for product in products if product.category == category and product.price <= max_price]
+            scan_range = (time.perf_counter() - start) / queries
+
+            start = time.perf_counter()
+            for category, max_price in range_queries:
+                Product.find_products(category=category, max_price=max_price)
+            index_range = (time.perf_counter() - start) / queries
+
+            print(f"{size:>9,} products | lookup: list {scan_lookup * 1e6:10.1f} us, store {index_lookup * 1e6:6.2f} us"
+                  f" | category under price: list {scan_range * 1e3:8.2f} ms, store {index_range * 1e3:6.3f} ms")
+    finally:
+        Product.inventory = saved_inventory
+
+
+def stress_test_orders(threads=8, hot_skus=16, orders_per_thread=20_000, stock_per_sku=10_000, seed=42):
+    # Run several threads placing orders for a few hot products at the same time, then report the
+    # throughput and check that no product was oversold: for every product the stock that is left plus
+    # the quantities of the successful orders must add up to the starting stock, and the stock must never
+    # go negative. A very short thread switch interval makes the threads interleave as often as possible.
+    saved_inventory, saved_interval = Product.inventory, sys.getswitchinterval()
+    try:
+        Product.inventory = InventoryStore()
+        for i in range(hot_skus):
+            Product.add_product(f"Hot item {i}", "Hot", stock_per_sku, 10, "Supplier A")
+        product_ids = [product.product_id for product in Product.inventory]
+        orders = [Order(order_id=i, products=[]) for i in range(threads)]
+        start_barrier = threading.Barrier(threads + 1)
+
+        def place_orders(order, rng):
+            start_barrier.wait()
+            for _ in range(orders_per_thread):
+                order.place_order(rng.choice(product_ids), rng.randint(1, 3))
+
+        workers = [threading.Thread(target=place_orders, args=(order, random.Random(seed + i))) for i, order in enumerate(orders)]
+        for worker in workers:
+            worker.start()
+        sys.setswitchinterval(1e-6)
+        start_barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        sys.setswitchinterval(saved_interval)
+
+        ordered = dict.fromkeys(product_ids, 0)
+        for order in orders:
+            for product_id, quantity in order.products:
+                ordered[product_id] += quantity
+        oversold = [
+            product_id for product_id in product_ids
+            if Product.inventory.get(product_id).quantity < 0
+            or Product.inventory.get(product_id).quantity + ordered[product_id] != stock_per_sku
+        ]
+        placed = sum(len(order.products) for order in orders)
+        print(f"{threads} threads, {hot_skus} hot SKUs: {threads * orders_per_thread:,} orders in {elapsed:.2f} s "
+              f"({threads * orders_per_thread / elapsed:,.0f} orders/s), {placed:,} placed, "
+              f"oversell check: {'FAILED for ' + str(oversold) if oversold else 'passed'}")
+        return not oversold
+    finally:
+        sys.setswitchinterval(saved_interval)
+        Product.inventory = saved_inventory
+
+
+def benchmark_batch_orders(lines=200_000, products=10_000, seed=42):
+    # Compare placing order lines one place_order call at a time with placing them as one place_many batch.
+    rng = random.Random(seed)
+    all_lines = [(rng.randint(1, products), rng.randint(1, 5)) for _ in range(lines)]
+    saved_inventory = Product.inventory
+    try:
+        timings = {}
+        for mode in ("place_order", "place_many"):
+            Product.inventory = InventoryStore()
+            for i in range(products):
+                Product.add_product(f"Item {i}", "Wholesale", lines, 10, "Supplier A")
+            orders = [(Order(order_id=i, products=[]), all_lines[i:i + 100]) for i in range(0, lines, 100)]
+            start = time.perf_counter()
+            if mode == "place_order":
+                for order, order_lines in orders:
+                    for product_id, quantity in order_lines:
+                        order.place_order(product_id, quantity)
+            else:
+                place_many(orders)
+            timings[mode] = time.perf_counter() - start
+        print(f"{lines:,} order lines: place_order loop {timings['place_order']:.3f} s, "
+              f"place_many batch {timings['place_many']:.3f} s ({timings['place_order'] / timings['place_many']:.1f}x)")
+    finally:
+        Product.inventory = saved_inventory
+
+
+def benchmark_columnar(size=1_000_000, seed=42):
+    # Compare the memory used per product by the default store and the columnar store, and time the
+    # vectorized stock value per category against a loop over Product objects.
+    categories = [f"Category {i}" for i in range(50)]
+    suppliers = [f"Supplier {i}" for i in range(200)]
+    saved_inventory = Product.inventory
+    try:
+        results = {}
+        for store_class in (InventoryStore, ColumnarInventoryStore):
+            rng = random.Random(seed)
+            tracemalloc.start()
+            Product.inventory = store_class()
+            for i in range(size):
+                Product.add_product(f"Item {i}", rng.choice(categories), rng.randint(0, 100), round(rng.uniform(1, 1000), 2), rng.choice(suppliers))
+            used, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            if store_class is ColumnarInventoryStore:
+                Product.inventory.stock_value_by_category()
+            else:
+                totals = {}
+                for product in Product.inventory:
+                    totals[product.category] = totals.get(product.category, 0) + product.quantity * product.price
+            results[store_class.__name__] = (used / size, time.perf_counter() - start)
+        for name, (bytes_per_product, seconds) in results.items():
+            print(f"{name:>22}: {bytes_per_product:6.1f} bytes per product, stock value per category in {seconds * 1e3:7.2f} ms")
+        print(f"ColumnarInventoryStore.memory_report(): {Product.inventory.memory_report()}")
+    finally:
+        Product.inventory = saved_inventory
+
+
+def benchmark_journal(sizes=(10_000, 100_000, 1_000_000), tail=10_000, writes=2_000, seed=42):
+    # Measure how long a restart takes (loading the snapshot and replaying a log tail of orders) as the
+    # catalogue grows, for both stores, and how many changes per second the log sustains with group commit.
+    rng = random.Random(seed)
+    saved_inventory = Product.inventory
+    try:
+        for size in sizes:
+            for store_class in (InventoryStore, ColumnarInventoryStore):
+                directory = tempfile.mkdtemp()
+                journal = open_inventory(directory, store_class())
+                for i in range(size):
+                    Product.add_product(f"Item {i}", f"Category {i % 50}", 1_000, round(rng.uniform(1, 1000), 2), f"Supplier {i % 200}")
+                journal.snapshot()
+                order = Order(order_id=1, products=[])
+                for _ in range(tail):
+                    order.place_order(rng.randint(1, size), 1)
+                journal.close()
+
+                start = time.perf_counter()
+                journal = open_inventory(directory, store_class())
+                restart = time.perf_counter() - start
+                journal.close()
+                shutil.rmtree(directory)
+                print(f"{size:>9,} products, {store_class.__name__:>22}: restart from snapshot + {tail:,} log records in {restart:.3f} s")
+
+        for group_commit in (1, 8, 64, 512):
+            directory = tempfile.mkdtemp()
+            journal = open_inventory(directory, group_commit=group_commit)
+            start = time.perf_counter()
+            for i in range(writes):
+                Product.add_product(f"Item {i}", "Category", 1, 1.0, "Supplier")
+            journal.close()
+            elapsed = time.perf_counter() - start
+            shutil.rmtree(directory)
+            print(f"group commit of {group_commit:>3}: {writes / elapsed:,.0f} durable writes/s")
+    finally:
+        Product.inventory = saved_inventory
+
+
+if __name__ == "__main__":
+    benchmark_inventory()
+    stress_test_orders()
+    benchmark_batch_orders()
+    benchmark_columnar()
+    benchmark_journal()
+    benchmark_intake()
@@ -1,6 +1,11 @@
 """
 A module to implement the BasicCalcualtor.
 """
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import numpy as np
 
 class BasicCalculator:
@@ -67,3 +72,295 @@ class MortgageCalculator(FinancialCalculator):
       # Return the loan amount
       return loan_amount
 
+
+"""
+A module to implement the MortgagePortfolio
+"""
+
+# One block of an amortization schedule: loans start to stop (in flattened portfolio order) by month.
+# interest, principal and balance have shape (stop - start, months), month i being the (i + 1)-th payment,
+# and are zero after a loan is paid off.
+AmortizationBlock = namedtuple("AmortizationBlock", ["start", "stop", "interest", "principal", "balance"])
+
+def monthly_payment(loan_amount, annual_interest_rate, years):
+    """
+    Fast scalar path: calculate the monthly payment of one loan with plain float arithmetic.
+    A zero interest rate spreads the loan amount evenly over the months.
+    """
+    monthly_interest_rate = annual_interest_rate / 12
+    months = years * 12
+    if monthly_interest_rate == 0:
+        return round(loan_amount / months, 2)
+    return round(loan_amount * monthly_interest_rate / (1 - (1 + monthly_interest_rate) ** -months), 2)
+
+class MortgagePortfolio(FinancialCalculator):
+    """
+    Prices many loans at once. loan_amount, annual_interest_rate and years can be scalars or arrays of any
+    shapes that broadcast together, and every calculation is done on whole arrays.
+    """
+
+    def __init__(self, loan_amount, annual_interest_rate, years):
+        self.loan_amount, annual_interest_rate, years = np.broadcast_arrays(
+            np.asarray(loan_amount, dtype=float), np.asarray(annual_interest_rate, dtype=float), np.asarray(years, dtype=float))
+        self.monthly_interest_rate = self.monthly_interest(annual_interest_rate)
+        self.months = self.months_from_years(years)
+        self.monthly_payment = self.calculate_monthly_payment()
+
+    # Calculate the monthly payment of every loan
+    def calculate_monthly_payment(self):
+        # (1 + r) ** n - 1 is computed as expm1(n * log1p(r)), which stays accurate for very small rates
+        growth = np.expm1(self.months * np.log1p(self.monthly_interest_rate))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            multiplier = self.monthly_interest_rate * (growth + 1) / growth
+        # Zero-rate loans are spread evenly over the months
+        multiplier = np.where(self.monthly_interest_rate == 0, 1 / self.months, multiplier)
+        return np.round(self.loan_amount * multiplier, 2)
+
+    # Calculate the loan amounts from monthly payments, monthly interest rates and numbers of payments
+    @staticmethod
+    def calculate_loan_amount(monthly_payment, monthly_interest_rate, nbr_payments):
+        """
+        Vectorized inverse of calculate_monthly_payment. Arguments can be scalars or broadcastable arrays.
+        """
+        monthly_payment, monthly_interest_rate, nbr_payments = np.broadcast_arrays(
+            np.asarray(monthly_payment, dtype=float), np.asarray(monthly_interest_rate, dtype=float), np.asarray(nbr_payments, dtype=float))
+
+        # Raise an error if any number of total payments is not greater than zero
+        if np.any(nbr_payments <= 0):
+            raise ValueError("The number of payments must be greater than zero.")
+
+        growth = np.expm1(nbr_payments * np.log1p(monthly_interest_rate))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            loan_amount = monthly_payment * growth / (monthly_interest_rate * (growth + 1))
+        return np.where(monthly_interest_rate == 0, monthly_payment * nbr_payments, loan_amount)
+
+    # Generate the amortization schedule of every loan, batch_size loans at a time
+    def amortization_schedule(self, batch_size=10_000):
+        """
+        Yield the schedule as AmortizationBlock objects of at most batch_size loans, so only one block is in memory
+        at a time. Each month the interest is charged on the opening balance and the rest of the monthly payment
+        repays principal; the last payment repays whatever balance is left.
+        """
+        loan_amount = self.loan_amount.ravel()
+        monthly_interest_rate = self.monthly_interest_rate.ravel()
+        months = self.months.ravel()
+        payment = self.monthly_payment.ravel()
+
+        for start in range(0, loan_amount.size, batch_size):
+            stop = min(start + batch_size, loan_amount.size)
+            principal_amount, rate = loan_amount[start:stop, None], monthly_interest_rate[start:stop, None]
+            term, loan_payment = months[start:stop, None], payment[start:stop, None]
+            paid = np.arange(int(term.max()))  # Number of payments made before each month
+
+            # Opening balance after `paid` payments: P * (1 + r) ** k - M * ((1 + r) ** k - 1) / r, or P - M * k at zero rate
+            growth = np.expm1(paid * np.log1p(rate))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                opening = principal_amount * (growth + 1) - loan_payment * np.where(rate == 0, paid, growth / rate)
+            opening = np.where(paid < term, np.maximum(opening, 0), 0)
+
+            interest = opening * rate
+            principal = np.where(paid == term - 1, opening, np.minimum(loan_payment - interest, opening))
+            yield AmortizationBlock(start, stop, interest, principal, opening - principal)
+
+    # Sum the schedule of all loans by month
+    def monthly_totals(self, batch_size=10_000):
+        """
+        Return the total interest, principal and closing balance of the whole portfolio for each month,
+        computed block by block from amortization_schedule.
+        """
+        total_months = int(self.months.max()) if self.months.size else 0
+        totals = {column: np.zeros(total_months) for column in ("interest", "principal", "balance")}
+        for block in self.amortization_schedule(batch_size):
+            for column in totals:
+                values = getattr(block, column).sum(axis=0)
+                totals[column][:values.size] += values
+        return totals
+
+    # Write the whole schedule to memory-mapped .npy files
+    def write_amortization_schedule(self, directory, batch_size=10_000):
+        """
+        Write interest.npy, principal.npy and balance.npy to directory, each of shape (loans, months), one block
+        at a time through memory-mapped files, so the schedule never has to fit in memory. The files can be
+        opened again with np.load(path, mmap_mode="r").
+        """
+        os.makedirs(directory, exist_ok=True)
+        shape = (self.loan_amount.size, int(self.months.max()) if self.months.size else 0)
+        columns = {column: np.lib.format.open_memmap(os.path.join(directory, f"{column}.npy"), mode="w+", dtype=np.float64, shape=shape)
+                   for column in ("interest", "principal", "balance")}
+        for block in self.amortization_schedule(batch_size):
+            for column, values in columns.items():
+                block_values = getattr(block, column)
+                values[block.start:block.stop, :block_values.shape[1]] = block_values
+                values[block.start:block.stop, block_values.shape[1]:] = 0
+        for values in columns.values():
+            values.flush()
+
+def benchmark_portfolio(loans=1_000_000, object_loans=100_000, seed=42):
+    # Compare pricing loans one MortgageCalculator at a time, with the scalar path, and with one MortgagePortfolio
+    rng = np.random.default_rng(seed)
+    loan_amounts = rng.uniform(50_000, 1_000_000, loans).round(-3)
+    annual_interest_rates = rng.choice([0.0, 0.025, 0.04, 0.055, 0.07], loans)
+    years = rng.choice([10, 15, 20, 25, 30], loans)
+
+    start = time.perf_counter()
+    object_payments = [MortgageCalculator(loan_amount, rate, year).monthly_payment
+                       for loan_amount, rate, year in zip(loan_amounts[:object_loans], annual_interest_rates[:object_loans], years[:object_loans])
+                       if rate > 0]  # MortgageCalculator cannot price zero-rate loans
+    object_rate = len(object_payments) / (time.perf_counter() - start)
+
+    loan_list, rate_list, year_list = loan_amounts.tolist(), annual_interest_rates.tolist(), years.tolist()
+    start = time.perf_counter()
+    scalar_payments = [monthly_payment(*loan) for loan in zip(loan_list, rate_list, year_list)]
+    scalar_rate = loans / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    portfolio = MortgagePortfolio(loan_amounts, annual_interest_rates, years)
+    vector_rate = loans / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    recovered = MortgagePortfolio.calculate_loan_amount(portfolio.monthly_payment, portfolio.monthly_interest_rate, portfolio.months)
+    inverse_rate = loans / (time.perf_counter() - start)
+
+    print(f"MortgageCalculator objects: {object_rate:,.0f} loans/s")
+    print(f"monthly_payment scalar path: {scalar_rate:,.0f} loans/s")
+    print(f"MortgagePortfolio: {vector_rate:,.0f} loans/s, inverse {inverse_rate:,.0f} loans/s")
+    print(f"largest difference from the scalar path: {np.max(np.abs(portfolio.monthly_payment - scalar_payments)):.2f}, "
+          f"largest loan amount error after the round trip: {np.max(np.abs(recovered - loan_amounts)):.2f}")
+
+def benchmark_amortization(loans=1_000_000, batch_size=10_000, seed=42):
+    # Time the streaming rollup of the interest paid each month across a portfolio
+    rng = np.random.default_rng(seed)
+    portfolio = MortgagePortfolio(rng.uniform(50_000, 1_000_000, loans).round(-3),
+                                  rng.choice([0.0, 0.025, 0.04, 0.055, 0.07], loans), rng.choice([10, 15, 20, 25, 30], loans))
+    start = time.perf_counter()
+    totals = portfolio.monthly_totals(batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{loans:,} loans x {totals['interest'].size} months streamed in {elapsed:.2f} s "
+          f"({loans * totals['interest'].size / elapsed:,.0f} loan-months/s), total interest {totals['interest'].sum():,.0f}")
+
+"""
+A module to implement the AdjustableRateMortgage and the interest rate scenario engine
+"""
+
+# Result of run_scenarios: annual index rates, monthly payments and closing balances, each of shape (scenarios, months)
+ScenarioResult = namedtuple("ScenarioResult", ["rate_paths", "payments", "balances"])
+
+def simulate_rate_paths(initial_rate, scenarios, months, long_term_rate=0.04, mean_reversion=0.2, volatility=0.01, rng=None):
+    """
+    Simulate monthly paths of an annual interest rate with a mean-reverting (Vasicek) model floored at zero.
+    Return an array of shape (scenarios, months) whose first column is initial_rate.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    dt = 1 / 12
+    rates = np.empty((scenarios, months))
+    rates[:, 0] = initial_rate
+    shocks = rng.standard_normal((scenarios, months - 1)) * volatility * np.sqrt(dt)
+    for month in range(1, months):
+        previous = rates[:, month - 1]
+        rates[:, month] = np.maximum(previous + mean_reversion * (long_term_rate - previous) * dt + shocks[:, month - 1], 0)
+    return rates
+
+class AdjustableRateMortgage(FinancialCalculator):
+    """
+    A loan whose rate is reset every reset_months months to the index rate plus a margin. At each reset the
+    monthly payment is recalculated so the remaining balance is repaid over the remaining months.
+    """
+
+    def __init__(self, loan_amount, years, margin=0.0, reset_months=12):
+        super().__init__()
+        self.loan_amount = loan_amount
+        self.months = int(self.months_from_years(years))
+        self.margin = margin
+        self.reset_months = reset_months
+
+    # Calculate the payment and balance trajectories of the loan under many rate paths at once
+    def trajectories(self, rate_paths):
+        """
+        rate_paths holds annual index rates of shape (paths, months), with at least as many months as the loan.
+        Return the monthly payments and the closing balances, both of shape (paths, loan months).
+        """
+        rate_paths = np.atleast_2d(rate_paths)
+        if rate_paths.shape[1] < self.months:
+            raise ValueError("The rate paths must cover every month of the loan.")
+
+        balance = np.full(rate_paths.shape[0], float(self.loan_amount))
+        payments = np.empty((rate_paths.shape[0], self.months))
+        balances = np.empty((rate_paths.shape[0], self.months))
+        for month in range(self.months):
+            if month % self.reset_months == 0:
+                rate = self.monthly_interest(np.maximum(rate_paths[:, month] + self.margin, 0))
+                remaining = self.months - month
+                growth = np.expm1(remaining * np.log1p(rate))
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    payment = np.where(rate == 0, balance / remaining, balance * rate * (growth + 1) / growth)
+            balance = balance * (1 + rate) - payment
+            payments[:, month] = payment
+            balances[:, month] = balance
+        balances[:, -1] = 0  # The last payment repays the balance exactly, up to rounding
+        return payments, balances
+
+def _run_scenario_chunk(task):
+    # Worker: attach to the shared arrays, simulate the rate paths of one chunk if needed and price the loan on them
+    names, shape, start, stop, seed_sequence, loan, rate_model = task
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        rate_paths, payments, balances = [np.ndarray(shape, dtype=np.float64, buffer=block.buf) for block in blocks]
+        if seed_sequence is not None:
+            rate_paths[start:stop] = simulate_rate_paths(scenarios=stop - start, months=shape[1], rng=np.random.default_rng(seed_sequence), **rate_model)
+        payments[start:stop], balances[start:stop] = loan.trajectories(rate_paths[start:stop])
+        del rate_paths, payments, balances  # Release the views before closing the shared memory
+    finally:
+        for block in blocks:
+            block.close()
+    return stop - start
+
+def run_scenarios(loan, rate_paths=None, scenarios=10_000, seed=None, workers=None, chunk_size=1_000, **rate_model):
+    """
+    Price an AdjustableRateMortgage under many rate scenarios on a pool of worker processes.
+    Pass rate_paths (scenarios x loan months) to use given paths, or let each chunk of chunk_size scenarios be
+    simulated with simulate_rate_paths(**rate_model) from its own child of np.random.SeedSequence(seed), so the
+    results only depend on seed and chunk_size, not on the number of workers. The rate paths, payments and
+    balances live in shared memory, so they are never copied between processes.
+    """
+    if rate_paths is not None:
+        rate_paths = np.atleast_2d(np.asarray(rate_paths, dtype=np.float64))[:, :loan.months]
+        scenarios = rate_paths.shape[0]
+    shape = (scenarios, loan.months)
+    size = max(int(np.prod(shape)) * 8, 1)
+    blocks = [shared_memory.SharedMemory(create=True, size=size) for _ in range(3)]
+    try:
+        arrays = [np.ndarray(shape, dtype=np.float64, buffer=block.buf) for block in blocks]
+        if rate_paths is not None:
+            arrays[0][:] = rate_paths
+
+        starts = range(0, scenarios, chunk_size)
+        seed_sequences = np.random.SeedSequence(seed).spawn(len(starts)) if rate_paths is None else [None] * len(starts)
+        tasks = [([block.name for block in blocks], shape, start, min(start + chunk_size, scenarios), seed_sequence, loan, rate_model)
+                 for start, seed_sequence in zip(starts, seed_sequences)]
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            list(pool.map(_run_scenario_chunk, tasks))
+        result = ScenarioResult(*(array.copy() for array in arrays))
+        del arrays  # Release the views before closing the shared memory
+        return result
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+def benchmark_scenarios(scenarios=20_000, seed=42):
+    # Report scenarios per second as the number of worker processes grows, and check the results do not change
+    loan = AdjustableRateMortgage(300_000, 30, margin=0.02)
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    reference = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        result = run_scenarios(loan, scenarios=scenarios, seed=seed, workers=workers, initial_rate=0.03)
+        elapsed = time.perf_counter() - start
+        reference = result if reference is None else reference
+        print(f"{workers:>3} workers: {scenarios / elapsed:,.0f} scenarios/s, "
+              f"same results as 1 worker: {np.array_equal(result.payments, reference.payments)}")
+
+if __name__ == "__main__":
+    benchmark_portfolio()
+    benchmark_amortization()
+    benchmark_scenarios()
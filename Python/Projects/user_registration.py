@@ -1,5 +1,27 @@
 # Re-run this cell and examine the docstring of each function
 from python_functions import validate_name, validate_email, validate_password, top_level_domains
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import csv
+import hashlib
+import hmac
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import weakref
+import pandas as pd
+
+# Arrow-backed strings run the pandas .str methods in compiled code; fall back to pandas' own strings without pyarrow
+try:
+    import pyarrow
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
 
 print("validate_name\n")
 print(validate_name.__doc__)
@@ -34,15 +56,418 @@ def validate_user(name, email, password):
 
 # USER REGISTRATION FUNCTION
 
-def register_user(name, email, password):
+def register_user(name, email, password, hasher=None, registry=None):
     try: 
         validate_user(name, email, password)
     except:
          return False
 
+    # With a UserRegistry, an email that is already registered is rejected
+    if registry is not None and not registry.add(email):
+        return False
+
+    user = {
+        "name": name,
+        "email": email,
+        # With a PasswordHasher, only the hash of the password is kept
+        "password": password if hasher is None else hasher.hash(password)
+    }
+    return user
+
+
+async def register_user_async(name, email, password, hasher, registry=None):
+    # Same as register_user, but waits for the password hash without blocking the event loop
+    try:
+        validate_user(name, email, password)
+    except:
+        return False
+
+    if registry is not None and not registry.add(email):
+        return False
+
     user = {
         "name": name,
         "email": email,
-        "password": password
+        "password": await hasher.hash_async(password)
     }
     return user
+
+
+# PASSWORD HASHING
+
+def hash_password(password, work_factor=14, salt=None):
+    """
+    Hash a password with scrypt, using 2 ** work_factor as the CPU/memory cost (each step up doubles the time).
+    Return a string "scrypt$<work_factor>$<salt>$<hash>" holding everything needed to check the password later.
+    """
+    salt = os.urandom(16) if salt is None else salt
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=2 ** work_factor, r=8, p=1, maxmem=2 ** (work_factor + 11))
+    return f"scrypt${work_factor}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password, hashed_password):
+    """
+    Check a password against a hash returned by hash_password.
+    """
+    _, work_factor, salt, _ = hashed_password.split("$")
+    return hmac.compare_digest(hash_password(password, int(work_factor), bytes.fromhex(salt)), hashed_password)
+
+
+class PasswordHasher:
+    """
+    Hashes passwords on a pool of worker processes, so slow hashing does not block the thread (or event loop)
+    registering the user. At most max_pending passwords are queued or being hashed at a time: when the limit is
+    reached, hash() blocks its thread and hash_async() waits on an asyncio.Semaphore, so the event loop keeps
+    running without tying up executor threads. Each event loop gets its own max_pending slots for hash_async(),
+    separate from those of hash().
+    """
+
+    def __init__(self, work_factor=14, workers=None, max_pending=None):
+        self.work_factor = work_factor
+        self.workers = workers or os.cpu_count()
+        self.max_pending = max_pending or 4 * self.workers
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.async_slots = weakref.WeakKeyDictionary()  # Event loop -> asyncio.Semaphore
+
+    def hash(self, password):
+        with self.slots:
+            return self.pool.submit(hash_password, password, self.work_factor).result()
+
+    async def hash_async(self, password):
+        # An asyncio.Semaphore belongs to one event loop, so each loop gets its own
+        loop = asyncio.get_running_loop()
+        if loop not in self.async_slots:
+            self.async_slots[loop] = asyncio.Semaphore(self.max_pending)
+        async with self.async_slots[loop]:
+            return await asyncio.wrap_future(self.pool.submit(hash_password, password, self.work_factor))
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark_registration(signups=400, concurrency=(1, 8, 32), work_factor=14):
+    # Register users concurrently through register_user_async and report registrations per second and p99 latency
+    async def run(hasher, concurrent_signups):
+        slots = asyncio.Semaphore(concurrent_signups)
+        latencies = []
+
+        async def sign_up(i):
+            async with slots:
+                start = time.perf_counter()
+                await register_user_async(f"User {i}", f"user{i}@example.com", f"Password{i}", hasher)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(sign_up(i) for i in range(signups)))
+        return time.perf_counter() - start, sorted(latencies)
+
+    with PasswordHasher(work_factor=work_factor) as hasher:
+        for concurrent_signups in concurrency:
+            elapsed, latencies = asyncio.run(run(hasher, concurrent_signups))
+            print(f"{concurrent_signups:>3} concurrent signups on {hasher.workers} processes: "
+                  f"{signups / elapsed:,.1f} registrations/s, p99 latency {latencies[int(len(latencies) * 0.99) - 1] * 1e3:.1f} ms")
+
+
+# DUPLICATE EMAIL DETECTION
+
+def normalize_email(email):
+    # Emails are compared without surrounding spaces and case
+    return email.strip().lower()
+
+
+class BloomFilter:
+    """
+    A compact set that can only answer "definitely not added" or "probably added". It uses num_bits bits and
+    num_hashes bit positions per item, derived from one blake2b hash (double hashing).
+    """
+
+    def __init__(self, num_bits, num_hashes):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray((num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def for_capacity(cls, capacity, false_positive_rate=0.01):
+        # Size the filter so that after capacity items about false_positive_rate of unseen items test positive
+        num_bits = max(8, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / max(capacity, 1) * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def expected_false_positive_rate(self):
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class UserRegistry:
+    """
+    Keeps track of registered emails so register_user can reject duplicates without a database round trip.
+    Emails registered through the registry (or loaded with rebuild) live in a set, checked in O(1).
+    Older users can instead be loaded with load_cold into a Bloom filter, which takes a few bits per user.
+    An email the Bloom filter does not know is new for sure. An email it reports may be a false positive, so it
+    is passed to confirm_cold (e.g. a database lookup), which load_cold requires; treating every reported email
+    as a duplicate would reject about false_positive_rate of the new users.
+    """
+
+    def __init__(self, confirm_cold=None):
+        self.emails = set()
+        self.cold = None
+        self.confirm_cold = confirm_cold
+
+    def __contains__(self, email):
+        email = normalize_email(email)
+        if email in self.emails:
+            return True
+        if self.cold is not None and email in self.cold:
+            return self.confirm_cold(email)
+        return False
+
+    def add(self, email):
+        # Register an email. Return False if it is already registered.
+        if email in self:
+            return False
+        self.emails.add(normalize_email(email))
+        return True
+
+    def rebuild(self, path):
+        # Replace the registered emails with those of a user dump: one email per line, or a CSV file whose
+        # header has an "email" column
+        self.emails = {normalize_email(email) for email in _dump_emails(path)}
+
+    def load_cold(self, path, false_positive_rate=0.01):
+        # Load the emails of a user dump (same formats as rebuild) into a Bloom filter sized for the dump
+        if self.confirm_cold is None:
+            raise ValueError("load_cold needs a confirm_cold lookup for the emails the Bloom filter reports")
+        self.cold = BloomFilter.for_capacity(sum(1 for _ in _dump_emails(path)), false_positive_rate)
+        for email in _dump_emails(path):
+            self.cold.add(normalize_email(email))
+
+    def memory_report(self):
+        # Bytes used by the set of emails (including the email strings) and by the Bloom filter
+        hot_bytes = sys.getsizeof(self.emails) + sum(sys.getsizeof(email) for email in self.emails)
+        cold_bytes = sys.getsizeof(self.cold.bits) if self.cold is not None else 0
+        return {
+            "hot_users": len(self.emails),
+            "hot_bytes_per_million": hot_bytes / max(len(self.emails), 1) * 1_000_000,
+            "cold_users": self.cold.count if self.cold is not None else 0,
+            "cold_bytes_per_million": cold_bytes / max(self.cold.count, 1) * 1_000_000 if self.cold is not None else 0,
+        }
+
+
+def _dump_emails(path):
+    # Yield the emails of a user dump. A CSV dump is parsed with the csv module, so quoted fields such as
+    # "Smith, John" do not shift the email column
+    with open(path, encoding="utf-8", newline="") as dump:
+        header = next(csv.reader([dump.readline()]), [])
+        columns = [column.strip().lower() for column in header]
+        if "email" not in columns:  # No header: one email per line
+            dump.seek(0)
+            yield from (line for line in dump if line.strip())
+            return
+        column = columns.index("email")
+        for row in csv.reader(dump):
+            if len(row) > column:
+                yield row[column]
+
+
+def benchmark_registry(users=1_000_000, probes=100_000, false_positive_rate=0.01):
+    # Build a user dump, then report the rebuild time, the memory per million users and the Bloom filter's
+    # measured false positive rate
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "users.csv")
+    with open(path, "w", encoding="utf-8") as dump:
+        dump.write("name,email\n")
+        for i in range(users):
+            dump.write(f"User {i},user{i}@example.com\n")
+
+    # The rebuilt set stands in for the database lookup that confirms the Bloom filter's hits
+    registry = UserRegistry(confirm_cold=lambda email: email in registry.emails)
+    start = time.perf_counter()
+    registry.rebuild(path)
+    rebuild_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    registry.load_cold(path, false_positive_rate)
+    cold_time = time.perf_counter() - start
+    os.remove(path)
+    os.rmdir(directory)
+
+    false_positives = sum(f"new{i}@example.com" in registry.cold for i in range(probes))
+    report = registry.memory_report()
+    print(f"{users:,} users: rebuild in {rebuild_time:.2f} s, Bloom filter load in {cold_time:.2f} s")
+    print(f"memory per million users: set {report['hot_bytes_per_million'] / 1e6:.1f} MB, "
+          f"Bloom filter {report['cold_bytes_per_million'] / 1e6:.2f} MB")
+    print(f"Bloom filter false positive rate: measured {false_positives / probes:.4f}, "
+          f"expected {registry.cold.expected_false_positive_rate():.4f}")
+
+
+# BATCH USER VALIDATION
+
+# The validate_user error messages, reused as the failure reasons of the batch validation
+NAME_ERROR = "Please make sure your name is greater than 2 characters!"
+EMAIL_ERROR = "Your email address is in the incorrect format, please enter a valid email."
+PASSWORD_ERROR = "Your password is too weak, ensure that your password is greater than 8 characters, and contains a capital letter and a number."
+
+# Precompiled patterns and a frozenset of the approved domains, shared by every batch. They restate the rules in the
+# python_functions docstrings: a name longer than 2 characters; an email of the form local@domain.tld (one "@", no
+# whitespace, a "." in the domain) ending with one of top_level_domains; a password longer than 8 characters with
+# an ASCII capital letter and an ASCII digit. python_functions is not part of this repository, so validate_users
+# checks a sample of every batch against validate_user itself and raises if the two ever disagree
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+UPPERCASE_PATTERN = re.compile(r"[A-Z]")
+DIGIT_PATTERN = re.compile(r"[0-9]")
+TOP_LEVEL_DOMAINS = frozenset(top_level_domains)
+
+
+def validate_users_chunk(users):
+    """
+    Validate a DataFrame of users with name, email and password columns using vectorized string operations.
+    Return a DataFrame with the same index and the columns name_valid, email_valid, password_valid, valid and
+    reason, where reason is the validate_user error message of the first failing check (or None).
+    """
+    names = users["name"].astype(STRING_DTYPE)
+    emails = users["email"].astype(STRING_DTYPE)
+    passwords = users["password"].astype(STRING_DTYPE)
+
+    # astype turns numbers such as 123 into text, so cells that were not strings are marked invalid first
+    name_valid = _is_str(users["name"]) & (names.str.len() > 2).fillna(False).astype(bool)
+
+    # The email must look like local@domain.tld and end with an approved top level domain
+    email_valid = _is_str(users["email"]) & (emails.str.match(EMAIL_PATTERN.pattern) & emails.str.endswith(tuple(TOP_LEVEL_DOMAINS))).fillna(False).astype(bool)
+
+    password_valid = _is_str(users["password"]) & (
+        (passwords.str.len() > 8)
+        & passwords.str.contains(UPPERCASE_PATTERN.pattern)
+        & passwords.str.contains(DIGIT_PATTERN.pattern)
+    ).fillna(False).astype(bool)
+
+    result = pd.DataFrame({"name_valid": name_valid, "email_valid": email_valid, "password_valid": password_valid})
+    result["valid"] = name_valid & email_valid & password_valid
+
+    # Report the first failing check, in the same order as validate_user
+    result["reason"] = None
+    result.loc[~password_valid, "reason"] = PASSWORD_ERROR
+    result.loc[~email_valid, "reason"] = EMAIL_ERROR
+    result.loc[~name_valid, "reason"] = NAME_ERROR
+    return result
+
+
+def _is_str(column):
+    # True for the cells holding a str. A string-typed column, or an object column found (in one C-level scan) to
+    # hold only str, just needs its missing values ruled out
+    if isinstance(column.dtype, pd.StringDtype) or pd.api.types.infer_dtype(column, skipna=True) in ("string", "empty"):
+        return column.notna()
+    return column.apply(isinstance, args=(str,)).astype(bool)
+
+
+def compare_with_validate_user(users, result, sample=1_000, seed=0):
+    """
+    Check validate_users against validate_user on a random sample of rows. Return the index labels of the rows
+    where the batch result (valid, and reason when validate_user raises one of its messages) differs.
+    """
+    rows = users.sample(min(sample, len(users)), random_state=seed)
+    mismatches = []
+    for label, name, email, password in zip(rows.index, rows["name"], rows["email"], rows["password"]):
+        try:
+            valid, reason = validate_user(name, email, password), None
+        except ValueError as error:
+            valid, reason = False, str(error)
+        except Exception:
+            valid, reason = False, result.at[label, "reason"]  # register_user treats any error as invalid
+        if bool(result.at[label, "valid"]) != valid or result.at[label, "reason"] != reason:
+            mismatches.append(label)
+    return mismatches
+
+
+def validate_users(users, workers=None, chunk_size=500_000, check_sample=1_000):
+    """
+    Validate many users at once. users is a DataFrame with name, email and password columns, or an iterable of
+    (name, email, password) tuples. Inputs larger than chunk_size rows are split into chunks that are validated
+    on a pool of worker processes (workers defaults to the number of CPUs; use workers=1 to stay in this process).
+    Return the validity mask and failure reasons as returned by validate_users_chunk.
+
+    Up to check_sample random rows are also run through validate_user, and a RuntimeError is raised if the batch
+    result differs for any of them (check_sample=0 skips the check).
+    """
+    if not isinstance(users, pd.DataFrame):
+        users = pd.DataFrame(list(users), columns=["name", "email", "password"])
+
+    if workers == 1 or len(users) <= chunk_size:
+        result = validate_users_chunk(users)
+    else:
+        chunks = [users.iloc[start:start + chunk_size] for start in range(0, len(users), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            result = pd.concat(pool.map(validate_users_chunk, chunks))
+
+    if check_sample:
+        mismatches = compare_with_validate_user(users, result, sample=check_sample)
+        if mismatches:
+            label = mismatches[0]
+            raise RuntimeError(f"validate_users disagrees with validate_user on {len(mismatches)} sampled rows, "
+                               f"e.g. row {label!r}: {tuple(users.loc[label, ['name', 'email', 'password']])}")
+    return result
+
+
+def benchmark_validation(rows=1_000_000, seed=42):
+    # Compare validating users one at a time with validate_user against validate_users
+    rng = random.Random(seed)
+    domains = sorted(top_level_domains) + [".xyz"]
+    users = [
+        (rng.choice(["Al", "Alice", "Bo", "Bob Smith"]),
+         rng.choice(["alice", "bob", "carol@"]) + "@example" + rng.choice(domains),
+         rng.choice(["password", "Password1", "Passw0rdLong", "short1A"]))
+        for _ in range(rows)
+    ]
+
+    start = time.perf_counter()
+    valid_per_row = []
+    for name, email, password in users:
+        try:
+            valid_per_row.append(validate_user(name, email, password))
+        except Exception:
+            valid_per_row.append(False)
+    per_row_time = time.perf_counter() - start
+
+    users = pd.DataFrame(users, columns=["name", "email", "password"])
+    timings = {}
+    for workers in (1, None):
+        start = time.perf_counter()
+        result = validate_users(users, workers=workers, chunk_size=max(1, rows // (os.cpu_count() or 1)))
+        timings[workers] = time.perf_counter() - start
+    assert result["valid"].tolist() == valid_per_row, "validate_users disagrees with validate_user"
+
+    # Rows with values that are not strings (numbers, missing values) must be invalid too
+    mixed = users.head(1_000).astype(object)
+    mixed.iloc[::3, 0] = 123
+    mixed.iloc[1::3, 1] = None
+    mixed.iloc[2::3, 2] = 1234567890
+    assert not compare_with_validate_user(mixed, validate_users_chunk(mixed)), "validate_users disagrees with validate_user on non-string values"
+
+    print(f"{rows:,} users: per-row loop {rows / per_row_time:,.0f} users/s, "
+          f"batch {rows / timings[1]:,.0f} users/s, batch on {os.cpu_count()} processes {rows / timings[None]:,.0f} users/s, "
+          f"{int(result['valid'].sum()):,} valid (per-row loop: {sum(valid_per_row):,})")
+
+
+if __name__ == "__main__":
+    benchmark_validation()
+    benchmark_registration()
+    benchmark_registry()
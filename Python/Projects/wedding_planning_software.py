@@ -17,17 +17,84 @@ In contrast, the Guest and SpecialGuest classes handle individual guest behavior
 include plus-one management.
 '''
 
-from typing import List, Optional
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# The possible statuses of an invitation. Every invitation refers to one of these interned strings
+# instead of holding its own copy.
+PENDING, ACCEPTED, DECLINED = RSVP_STATUSES = tuple(sys.intern(status) for status in ("pending", "accepted", "declined"))
+
+# All classes below use __slots__, so their instances store their attributes in fixed slots instead of a
+# per-instance __dict__, which keeps the memory used per guest low when many guests are loaded.
+
+class EmailIndexedList:
+    # A list-like collection of guests or invitations, stored in a dict keyed by the guest's email address.
+    # It supports the list operations the wedding classes use (append, remove, in, len, iteration and indexing),
+    # but append, remove, `in` and looking an item up by email take O(1) time instead of scanning the whole list.
+    # Items keep the order in which they were appended.
+    __slots__ = ("key", "items")
+
+    def __init__(self, key: Callable[[Any], str]) -> None:
+        # Parameters:
+        # - key: A function returning the email address of an item.
+        self.key: Callable[[Any], str] = key  # Function returning the email address of an item.
+        self.items: Dict[str, Any] = {}  # Dict storing the items, keyed by email address.
+
+    def append(self, item: Any) -> None:
+        # Method to add an item, replacing any item with the same email address.
+        self.items[self.key(item)] = item
+
+    def extend(self, items: Iterable[Any]) -> None:
+        # Method to add several items at once, replacing any items with the same email addresses.
+        self.items.update((self.key(item), item) for item in items)
+
+    def remove(self, item: Any) -> None:
+        # Method to remove an item. Raises ValueError if it is not in the collection, like list.remove.
+        if self.key(item) not in self.items:
+            raise ValueError("Item not in list")
+        del self.items[self.key(item)]
+
+    def get(self, email: str) -> Optional[Any]:
+        # Method to retrieve the item with the given email address, or None if there is none.
+        return self.items.get(email)
+
+    def __contains__(self, item: Any) -> bool:
+        return self.key(item) in self.items
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.items.values())
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, index: int) -> Any:
+        return list(self.items.values())[index]
+
+    def __repr__(self) -> str:
+        return repr(list(self.items.values()))
 
 class Wedding:
+    __slots__ = ("bride_name", "groom_name", "confirmed_guest_list", "invitation_list", "invitations_by_status")
+
     def __init__(self, bride_name: str, groom_name: str) -> None:
         # The __init__ method initializes a new instance of the Wedding class.
         # It sets the bride's and groom's names, as well as creates empty lists
-        # for confirmed guests and invitations.
+        # for confirmed guests and invitations. Both lists are indexed by email address.
         self.bride_name: str = bride_name  # Instance variable to store the bride's name.
         self.groom_name: str = groom_name  # Instance variable to store the groom's name.
-        self.confirmed_guest_list: List['Guest'] = []  # List to store guests who have confirmed attendance.
-        self.invitation_list: List['Invitation'] = []  # List to store all invitations sent for the wedding.
+        self.confirmed_guest_list: EmailIndexedList = EmailIndexedList(lambda guest: guest.email)  # List to store guests who have confirmed attendance.
+        self.invitation_list: EmailIndexedList = EmailIndexedList(lambda invitation: invitation.guest.email)  # List to store all invitations sent for the wedding.
+        # The invitations partitioned by status. Invitation.accept and Invitation.decline move an invitation between
+        # them, so the number of invitations with each status is always known without looking at every invitation.
+        self.invitations_by_status: Dict[str, EmailIndexedList] = {
+            status: EmailIndexedList(lambda invitation: invitation.guest.email) for status in RSVP_STATUSES
+        }
     
     def send_invitation(self, name: str, email: str, is_special: bool = False) -> None:
         # Method to send an invitation to a guest.
@@ -48,6 +115,7 @@ class Wedding:
         # Create an invitation for the guest and add it to the invitation list.
         invitation: Invitation = Invitation(guest)
         self.invitation_list.append(invitation)
+        self.invitations_by_status[invitation.status].append(invitation)  # Count the new invitation as pending.
 
     def retrieve_invitation(self, email: str) -> Optional['Invitation']:
         # Method to retrieve an invitation using the guest's email address.
@@ -55,10 +123,7 @@ class Wedding:
         # - email: The email address of the guest.
         # Returns: The Invitation object if found, otherwise None.
 
-        for invitation in self.invitation_list:  # Iterate through all invitations.
-            if invitation.guest.email == email:  # Check if the email matches.
-                return invitation  # Return the matching invitation.
-        return None  # Return None if no matching invitation is found.
+        return self.invitation_list.get(email)  # Look the invitation up in the email index.
 
     def get_guest_by_email(self, email: str) -> Optional['Guest']:
         # Method to retrieve a guest using their email address.
@@ -66,29 +131,145 @@ class Wedding:
         # - email: The email address of the guest.
         # Returns: The Guest object if found, otherwise None.
 
-        for invitation in self.invitation_list:  # Iterate through all invitations.
-            if invitation.guest.email == email:  # Check if the email matches.
-                return invitation.guest  # Return the matching guest.
-        return None  # Return None if no matching guest is found.
+        invitation = self.invitation_list.get(email)  # Look the invitation up in the email index.
+        return invitation.guest if invitation else None  # Return the matching guest, or None if there is none.
+
+    def import_guests(self, path: str, chunk_size: int = 10_000) -> Dict[str, float]:
+        # Method to send invitations to every guest listed in a CSV or JSONL file (see read_guest_chunks).
+        # The file is read chunk_size rows at a time, so only one chunk of rows is held in memory. Emails that were
+        # already invited, or appear earlier in the file, are skipped. A row can also name a plus-one for a special
+        # guest, who is invited in the same way as SpecialGuest.invite_plus_one.
+        # The invitations of each chunk are added to the invitation list in one batch.
+        # Parameters:
+        # - path: The path of the guest file.
+        # - chunk_size: The number of rows read and invited at a time.
+        # Returns: A report with the number of rows read, invitations sent, duplicates skipped and rows per second.
+
+        start = time.perf_counter()
+        rows = invited = duplicates = 0
+        for chunk in read_guest_chunks(path, chunk_size):
+            new_invitations: Dict[str, Invitation] = {}  # Invitations of this chunk, keyed by email address.
+            for row in chunk:
+                rows += 1
+                email = row["email"]
+                if email in self.invitation_list.items or email in new_invitations:  # Skip emails already invited.
+                    duplicates += 1
+                    continue
+                if row["is_special"]:
+                    guest: Guest = SpecialGuest(row["name"], email, self)
+                else:
+                    guest = Guest(row["name"], email, self)
+                new_invitations[email] = Invitation(guest)
+
+                plus_one_email = row["plus_one_email"]
+                if isinstance(guest, SpecialGuest) and plus_one_email:
+                    if plus_one_email in self.invitation_list.items or plus_one_email in new_invitations:
+                        duplicates += 1
+                        continue
+                    guest.plus_one = Guest(row["plus_one_name"], plus_one_email, self, email)
+                    new_invitations[plus_one_email] = Invitation(guest.plus_one)
+            self.invitation_list.extend(new_invitations.values())
+            self.invitations_by_status[PENDING].extend(new_invitations.values())
+            invited += len(new_invitations)
+
+        elapsed = time.perf_counter() - start
+        return {"rows": rows, "invited": invited, "duplicates": duplicates, "seconds": elapsed,
+                "rows_per_second": rows / elapsed if elapsed else 0.0}
+
+    def remove_invitation(self, invitation: 'Invitation') -> None:
+        # Method to remove an invitation from the wedding, and from the count of its status.
+        # Parameters:
+        # - invitation: The Invitation object to remove.
+
+        self.invitation_list.remove(invitation)
+        self.invitations_by_status[invitation.status].remove(invitation)
+
+    def rsvp_summary(self) -> Dict[str, int]:
+        # Method to count the invitations by status.
+        # Returns: A dict with the number of accepted, declined and pending invitations, and the total.
+
+        summary = {status: len(invitations) for status, invitations in self.invitations_by_status.items()}
+        summary["total"] = len(self.invitation_list)
+        return summary
+
+    def guests_by_status(self, status: str) -> Iterator['Guest']:
+        # Method to iterate over the guests whose invitation has the given status, without looking at the others.
+        # Replies must not change while iterating; take a list() of the guests first to do that.
+        # Parameters:
+        # - status: "accepted", "declined" or "pending".
+
+        if status not in self.invitations_by_status:
+            raise ValueError(f"Unknown RSVP status {status!r}, expected one of {', '.join(RSVP_STATUSES)}.")
+        return (invitation.guest for invitation in self.invitations_by_status[status])
+
+def read_guest_chunks(path: str, chunk_size: int = 10_000) -> Iterator[List[Dict[str, Any]]]:
+    # Function to stream a guest file as lists of at most chunk_size rows.
+    # Files ending in .jsonl or .json hold one JSON object per line; any other file is read as CSV with a header row.
+    # Each row has the keys name, email, is_special, plus_one_name and plus_one_email; only name and email are
+    # required in the file. is_special accepts true/false, yes/no or 1/0 in a CSV file.
+    # Parameters:
+    # - path: The path of the guest file.
+    # - chunk_size: The largest number of rows in a chunk.
+
+    with open(path, newline="", encoding="utf-8") as guest_file:
+        if os.path.splitext(path)[1].lower() in (".jsonl", ".json"):
+            records: Iterable[Dict[str, Any]] = (json.loads(line) for line in guest_file if line.strip())
+        else:
+            records = csv.DictReader(guest_file)
+        chunk: List[Dict[str, Any]] = []
+        for record in records:
+            is_special = record.get("is_special") or False
+            if isinstance(is_special, str):
+                is_special = is_special.strip().lower() in ("true", "yes", "1")
+            chunk.append({
+                "name": record["name"],
+                "email": record["email"],
+                "is_special": bool(is_special),
+                "plus_one_name": record.get("plus_one_name") or None,
+                "plus_one_email": record.get("plus_one_email") or None,
+            })
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
 class Invitation:
+    __slots__ = ("guest", "status")
+
     def __init__(self, guest: 'Guest') -> None:
         # The __init__ method initializes a new instance of the Invitation class.
         # Parameters:
         # - guest: The Guest object for whom the invitation is created.
 
         self.guest: Guest = guest  # Instance variable to store the guest associated with this invitation.
-        self.status: str = "pending"  # Instance variable to store the status of the invitation (default is "pending").
+        self.status: str = PENDING  # Instance variable to store the status of the invitation (default is "pending").
 
     def accept(self) -> None:
         # Method to mark the invitation as accepted.
-        self.status = "accepted"  # Update the status to "accepted".
+        self.set_status(ACCEPTED)  # Update the status to "accepted".
 
     def decline(self) -> None:
         # Method to mark the invitation as declined.
-        self.status = "declined"  # Update the status to "declined".
+        self.set_status(DECLINED)  # Update the status to "declined".
+
+    def set_status(self, status: str) -> None:
+        # Method to update the status, moving the invitation to the matching status partition of its wedding.
+        # Parameters:
+        # - status: The new status of the invitation.
+
+        if status not in RSVP_STATUSES:  # Check before touching the partitions, so a bad status changes nothing.
+            raise ValueError(f"Unknown RSVP status {status!r}, expected one of {', '.join(RSVP_STATUSES)}.")
+        status = sys.intern(status)  # Share one string object per status.
+        wedding = self.guest.wedding
+        if wedding.invitation_list.get(self.guest.email) is self:  # Only invitations still in the wedding are counted.
+            wedding.invitations_by_status[self.status].remove(self)
+            wedding.invitations_by_status[status].append(self)
+        self.status = status
 
 class Guest:
+    __slots__ = ("name", "email", "wedding", "inviting_guest_email")
+
     def __init__(self, name: str, email: str, wedding: Wedding, inviting_guest_email: Optional[str] = None) -> None:
         # The __init__ method initializes a new instance of the Guest class.
         # Parameters:
@@ -119,6 +300,8 @@ class Guest:
                 self.wedding.confirmed_guest_list.remove(self)  # Remove the guest from the confirmed guest list.
 
 class SpecialGuest(Guest):
+    __slots__ = ("plus_one",)
+
     def __init__(self, name: str, email: str, wedding: Wedding) -> None:
         # The __init__ method initializes a new instance of the SpecialGuest class.
         # Inherits from the Guest class and adds functionality for a plus-one.
@@ -150,9 +333,85 @@ class SpecialGuest(Guest):
 
         if self.plus_one:  # Check if a plus-one exists.
             invitation = self.wedding.retrieve_invitation(self.plus_one.email)  # Retrieve plus-one's invitation.
-            self.wedding.invitation_list.remove(invitation)  # Remove invitation from wedding list.
+            self.wedding.remove_invitation(invitation)  # Remove invitation from wedding list and from the RSVP counts.
 
             if self.plus_one in self.wedding.confirmed_guest_list:  # If plus-one is in confirmed list.
                 self.wedding.confirmed_guest_list.remove(self.plus_one)  # Remove plus-one from confirmed list.
 
             self.plus_one = None  # Reset plus-one reference to None.
+
+def benchmark_wedding(guests: int = 100_000) -> None:
+    # Time inviting guests, having every guest reply, and then having every other guest change their reply.
+    wedding = Wedding("Alice", "Bob")
+
+    start = time.perf_counter()
+    for i in range(guests):
+        wedding.send_invitation(f"Guest {i}", f"guest{i}@example.com", is_special=(i % 10 == 0))
+    invite_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(guests):
+        guest = wedding.get_guest_by_email(f"guest{i}@example.com")
+        if i % 3:
+            guest.accept_invitation()
+        else:
+            guest.decline_invitation()
+    for i in range(0, guests, 2):  # Every other guest changes their reply.
+        guest = wedding.get_guest_by_email(f"guest{i}@example.com")
+        if i % 3:
+            guest.decline_invitation()
+        else:
+            guest.accept_invitation()
+    rsvp_time = time.perf_counter() - start
+
+    print(f"Invited {guests:,} guests in {invite_time:.3f} s, processed {guests + guests // 2:,} RSVPs in {rsvp_time:.3f} s, "
+          f"{len(wedding.confirmed_guest_list):,} confirmed guests, RSVP summary {wedding.rsvp_summary()}")
+
+def benchmark_import(rows: int = 1_000_000, chunk_size: int = 10_000) -> None:
+    # Write a synthetic guest CSV file (with some duplicate rows and plus-ones) and time importing it.
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "guests.csv")
+    with open(path, "w", newline="", encoding="utf-8") as guest_file:
+        writer = csv.writer(guest_file)
+        writer.writerow(["name", "email", "is_special", "plus_one_name", "plus_one_email"])
+        for i in range(rows):
+            guest_id = i if i % 20 else i // 2  # Every 20th row repeats an earlier email.
+            if i % 10 == 1:
+                writer.writerow([f"Guest {guest_id}", f"guest{guest_id}@example.com", "true", f"Plus one {i}", f"plus{i}@example.com"])
+            else:
+                writer.writerow([f"Guest {guest_id}", f"guest{guest_id}@example.com", "false", "", ""])
+
+    wedding = Wedding("Alice", "Bob")
+    report = wedding.import_guests(path, chunk_size)
+    os.remove(path)
+    os.rmdir(directory)
+    print(f"Imported {report['rows']:,} rows in {report['seconds']:.2f} s ({report['rows_per_second']:,.0f} rows/s): "
+          f"{report['invited']:,} invitations, {report['duplicates']:,} duplicates skipped")
+
+def benchmark_memory(guests: int = 1_000_000) -> None:
+    # Measure the memory used per invited guest (the Guest, its Invitation and their index entries) with the
+    # __slots__ classes, and with equivalent classes storing their attributes in a __dict__ as before.
+    class DictGuest:
+        def __init__(self, name: str, email: str, wedding: Wedding) -> None:
+            self.name, self.email, self.wedding, self.inviting_guest_email = name, email, wedding, None
+
+    class DictInvitation:
+        def __init__(self, guest: DictGuest) -> None:
+            self.guest, self.status = guest, "pending"
+
+    for label, guest_class, invitation_class in (("__dict__", DictGuest, DictInvitation), ("__slots__", Guest, Invitation)):
+        emails = [f"guest{i}@example.com" for i in range(guests)]  # Names and emails are shared by both runs.
+        wedding = Wedding("Alice", "Bob")
+        tracemalloc.start()
+        invitations = [invitation_class(guest_class(email, email, wedding)) for email in emails]
+        wedding.invitation_list.extend(invitations)
+        wedding.invitations_by_status[PENDING].extend(invitations)
+        del invitations
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>9}: {used / guests:6.1f} bytes per guest for {guests:,} guests")
+
+if __name__ == "__main__":
+    benchmark_wedding()
+    benchmark_import()
+    benchmark_memory()